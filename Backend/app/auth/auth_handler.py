@@ -1,9 +1,192 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
 import bcrypt
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor for new hashes; stored hashes with another cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so these threads hash in parallel without blocking the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for a worker; beyond that requests get a 503 instead of queueing up
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
 
-def hash_password(password: str) -> str:
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
     #Hash the plain password using bcrypt.
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     #Verify the plain password against the hashed password.
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." hash, None if it isn't a bcrypt hash."""
+    parts = hashed_password.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_rounds(hashed_password) != rounds
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated, bounded thread pool.
+
+    A hash takes ~250 ms of CPU at cost 12; run inline it stalls every request on the worker.
+    Here at most `workers` hashes run at once and at most `max_queue` more wait; further
+    requests are refused with a 503 (and Retry-After) right away rather than timing out
+    behind the queue. Latencies (queue wait + hashing) are kept for the last 1000 calls.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.max_pending = 0
+        self.counters = {"hash": 0, "verify": 0, "rehash": 0, "rejected": 0}
+        self._latencies = {"hash": deque(maxlen=1000), "verify": deque(maxlen=1000)}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def has_capacity(self) -> bool:
+        return self.pending < self.workers + self.max_queue
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        if not self.has_capacity():
+            self.counters["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Authentication is busy, please retry",
+                                headers={"Retry-After": "1"})
+        self.counters[operation] += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self._latencies[operation].append(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    async def rehash_if_needed(self, password: str, hashed_password: str) -> Optional[str]:
+        """A hash with the configured cost for a just-verified password whose hash has another cost.
+
+        None if no rehash is needed, or if the pool is busy: the next login tries again.
+        """
+        if not needs_rehash(hashed_password, self.rounds) or not self.has_capacity():
+            return None
+        self.counters["rehash"] += 1
+        return await self.hash(password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        def percentiles(values) -> Dict[str, float]:
+            values = sorted(values)
+            if not values:
+                return {"p50_ms": 0, "p99_ms": 0, "max_ms": 0}
+            return {
+                "p50_ms": round(values[len(values) // 2] * 1000, 1),
+                "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+
+        return {
+            **self.counters,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            **{f"{operation}_latency": percentiles(values) for operation, values in self._latencies.items()},
+            "limits": {"workers": self.workers, "max_queue": self.max_queue, "rounds": self.rounds},
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+# ---------- BENCHMARK ----------
+async def bench(logins: int, concurrency: int, inline: bool = False) -> Dict[str, Any]:
+    """Concurrent verify() calls, as a login burst does, plus how long the event loop stalled.
+
+    inline=True verifies on the event loop like the handlers used to, for comparison.
+    """
+    hashed = hash_password("correct horse battery staple")
+    latencies, lags = [], []
+    rejected = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if inline:
+                    verify_password("correct horse battery staple", hashed)
+                else:
+                    await password_hasher.verify("correct horse battery staple", hashed)
+            except HTTPException:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    async def ticker():
+        # a request that should take no time: how late does it run?
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    tick.cancel()
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "mode": "inline" if inline else f"pool({password_hasher.workers} workers, queue {password_hasher.max_queue})",
+        "rounds": hash_rounds(hashed),
+        "logins": len(latencies),
+        "rejected": rejected,
+        "logins_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1) if latencies else None,
+        "event_loop_lag_max_ms": round(lags[-1] * 1000, 1) if lags else round(elapsed * 1000, 1),
+    }
+
+
+def _main():
+    """python -m app.auth.auth_handler [--logins N] [--concurrency N] [--inline]"""
+    parser = argparse.ArgumentParser(description="Measure login (bcrypt verify) latency under concurrent load")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20, help="logins in flight at once")
+    parser.add_argument("--inline", action="store_true", help="verify on the event loop instead of the pool")
+    args = parser.parse_args()
+    print(asyncio.run(bench(args.logins, args.concurrency, args.inline)))
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    _main()
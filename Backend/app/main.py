@@ -3,6 +3,7 @@
 import os
 import json
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from datetime import datetime
 from typing import Dict, List, Optional, Any
@@ -27,15 +28,50 @@ from fpdf import FPDF
 
 # App internals
 from app.database import db
-from app.routes import test, auth, esg, recommendations, reportGeneration
+from app.routes import test, auth, esg, recommendations, reportGeneration, jobs, suppliers
 from app.services.gemini_service import gemini_service
+from app.services.process_pool import shutdown_process_pool
+from app.services.extraction_cache import extraction_cache
+from app.services.esg_extractions import extraction_store
+from app.services.job_queue import job_queue
+from app.services.http_client import get_http_client, close_http_client
+from app.services.gemini_client import gemini_gateway
+from app.services.esg_imputation import peer_stats
+from app.services.supplier_store import supplier_store
+from app.services.supplier_search import supplier_search
+from app.services.score_history import score_history
+from app.services.tenants import tenants
+from app.auth.auth_handler import password_hasher
+from app.services.indexes import ensure_indexes, verify_query_plans
 
 # Load environment variables
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
+# ------------------- Lifespan -------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    await ensure_indexes()
+    await verify_query_plans()
+    await extraction_cache.ensure_indexes()
+    await extraction_store.ensure_indexes()
+    await job_queue.ensure_indexes()
+    await peer_stats.ensure_ready()
+    await score_history.ensure_ready()
+    supplier_search.attach()
+    tenants.attach()
+    await supplier_store.start()
+    await job_queue.start()
+    yield
+    await supplier_store.stop()
+    await job_queue.stop()
+    await close_http_client()
+    shutdown_process_pool()
+    password_hasher.shutdown()
+
 # ------------------- FastAPI App Initialization -------------------
-app = FastAPI(title="ESG Auto-Fill System", version="1.0.0")
+app = FastAPI(title="ESG Auto-Fill System", version="1.0.0", lifespan=lifespan)
 
 # ------------------- Logger Setup -------------------
 logging.basicConfig(level=logging.INFO)
@@ -57,6 +93,8 @@ app.include_router(esg.router, prefix="/api")
 app.include_router(recommendations.router)
 app.include_router(reportGeneration.router)
 app.include_router(profile.router)
+app.include_router(jobs.router)
+app.include_router(suppliers.router)
 
 # ------------------- Custom Exception Handler -------------------
 @app.exception_handler(RequestValidationError)
@@ -81,23 +119,16 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/gemini")
+async def gemini_gateway_stats():
+    """Queue depth, wait times and coalescing counters of the outbound Gemini gateway."""
+    return gemini_gateway.stats()
+
+@app.get("/health/password-hashing")
+async def password_hashing_stats():
+    """Queue depth, rejections and p50/p99 latency of the bcrypt thread pool."""
+    return password_hasher.stats()
+
 @app.get("/ping")
 async def ping_db():
     return {"msg": "Pretend MongoDB is connected (DB removed in this version)"}
-
-# ------------------- Supplier Endpoint -------------------
-@app.get("/api/suppliers")
-async def get_all_suppliers():
-    try:
-        cursor = db.suppliers.find({}, {"_id": 0})
-        suppliers = await cursor.to_list(length=None)
-        return {"suppliers": suppliers}
-    except Exception as e:
-        logger.exception("Error fetching suppliers")
-        return {"error": str(e)}
-
-
-
-
-
-
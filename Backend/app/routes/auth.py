@@ -1,63 +1,99 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Request, status
 from app.schemas.auth_schemas import CompanyRegister, SupplierRegister, EmployeeRegister, EmployeeLogin
-from app.auth.auth_handler import hash_password, verify_password
+from app.auth.auth_handler import password_hasher
 from app.auth.jwt import create_jwt_token
 from app.database import db 
+from app.services.supplier_store import supplier_store
+from app.services.bulk_import import import_stream, KINDS, FORMATS
+from app.services.tenants import tenants, tenant_collection
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register/company")
 async def register_company(data: CompanyRegister):
-    existing = await db.companies.find_one({"email_domain": data.email_domain})
+    existing = await tenants.company(data.email_domain)
     if existing:
         raise HTTPException(status_code=400, detail="Company already registered")
 
     await db.companies.insert_one(data.dict())
+    tenants.invalidate("companies", data.email_domain)
     return {"success": True, "message": "Company registered successfully"}
 
 
 @router.post("/register/supplier")
 async def register_supplier(data: SupplierRegister):
-    existing = await db.suppliers.find_one({"email_domain": data.email_domain})
+    existing = await tenants.supplier(data.email_domain)
     if existing:
         raise HTTPException(status_code=400, detail="Supplier already registered")
 
-    await db.suppliers.insert_one(data.dict())
+    supplier = data.dict()
+    supplier["last_updated"] = datetime.utcnow()  # listing ETags and the store's poller key on it
+    await db.suppliers.insert_one(supplier)  # sets supplier["_id"]
+    # the store's listeners (search index, tenant cache, ...) pick the new supplier up immediately
+    supplier_store.upsert(supplier)
     return {"success": True, "message": "Supplier registered successfully"}
 
 
+@router.post("/register/{kind}/bulk")
+async def bulk_register(kind: str, request: Request, format: str = None):
+    """
+    Register many suppliers or companies from a CSV (header row + one row each) or NDJSON body,
+    e.g. curl --data-binary @suppliers.csv -H "Content-Type: text/csv". The body is read as a
+    stream; the answer lists every rejected row with its line number, and rows per second.
+    """
+    if kind not in KINDS:
+        raise HTTPException(status_code=404, detail=f"Can only bulk-register {sorted(KINDS)}")
+    content_type = request.headers.get("content-type", "")
+    format = format or ("ndjson" if "json" in content_type else "csv")
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {list(FORMATS)}")
+
+    result = await import_stream(kind, request.stream(), format)
+    if kind == "suppliers" and result["inserted"]:
+        await supplier_store.reload()
+    return result
+
+
 @router.post("/register/employee")
 async def register_employee(data: EmployeeRegister):
     domain = data.email.split('@')[-1]
 
-    # Decide where to search based on role
-    if data.role.lower() == "supplier":
-        authorized = await db.suppliers.find_one({"email_domain": domain})
-    else:
-        authorized = await db.companies.find_one({"email_domain": domain})
+    # Domain and user checks are independent; run them concurrently
+    authorized, existing_user = await asyncio.gather(
+        tenants.tenant(tenant_collection(data.role), domain),
+        tenants.user(data.email),
+    )
 
     if not authorized:
         raise HTTPException(status_code=403, detail="Email domain not authorized")
 
-    existing_user = await db.users.find_one({"email": data.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Employee already exists")
 
-    hashed_pw = hash_password(data.password)
+    hashed_pw = await password_hasher.hash(data.password)
     await db.users.insert_one({
         "email": data.email,
         "password": hashed_pw,
         "role": data.role
     })
+    tenants.invalidate_user(data.email)
     return {"success": True, "message": "Employee registered successfully"}
 
 
 @router.post("/login/employee")
 async def login_employee(data: EmployeeLogin):
     user = await db.users.find_one({"email": data.email})
-    if not user or not verify_password(data.password, user['password']):
+    if not user or not await password_hasher.verify(data.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the password
+    new_hash = await password_hasher.rehash_if_needed(data.password, user['password'])
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"], "password": user["password"]}, {"$set": {"password": new_hash}})
+        tenants.invalidate_user(data.email)
+
     token = create_jwt_token({"email": user["email"], "role": user["role"]})
     return {
         "success": True,
@@ -1,19 +1,23 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from datetime import datetime
 import os, json, re, logging
-import requests
 from dotenv import load_dotenv
 from fastapi import Request
 from app.database import db 
-from app.services.gemini_service import gemini_service
-import google.generativeai as genai
+from app.services.esg_pipeline import calculate_category_score, extract_report, store_extraction, score_supplier
+from app.services.esg_bulk import rescore_all
+from app.services.esg_scoring import WEIGHT_PROFILES
+from app.services.esg_imputation import peer_stats
+from app.services.esg_extractions import extraction_store
+from app.services.score_history import score_history, INTERVALS
+from app.services.tenants import tenants
 import traceback
-from datetime import datetime  
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 load_dotenv()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # ---------- MODELS ----------
 class ESGInput(BaseModel):
@@ -23,11 +27,6 @@ class ESGCalculationRequest(BaseModel):
     result: Dict[str, Any]
     overall_data: Dict[str, Any]
 
-# ---------- HELPERS ----------
-def calculate_category_score(scores):
-    valid_scores = [v for v in scores.values() if isinstance(v, (int, float))]
-    return round(sum(valid_scores) / len(valid_scores), 2) if valid_scores else 0
-
 # ---------- 1. EXTRACT AND PREFILL ESG DATA ----------
 @router.post("/submit-esg-report")
 async def submit_esg_report(file: UploadFile = File(...), email: str = Form(...)):
@@ -39,24 +38,14 @@ async def submit_esg_report(file: UploadFile = File(...), email: str = Form(...)
 
     try:
         file_content = await file.read()
-        gemini = gemini_service(api_key=os.getenv("GEMINI_API_KEY"))
-        result = await gemini.extract_esg_data(file_content, file.filename)
+        result = await extract_report(file_content, file.filename)
 
         email_domain = email.split('@')[1]
-        supplier = await db.suppliers.find_one({"email_domain": email_domain})
-
-        if not supplier:
-            raise HTTPException(status_code=404, detail="Supplier not found")
-
-        update_fields = {
-            "esg_upload_result": result.get("result"),
-            "esg_overall_data": result.get("overall_data"),
-            "esg_upload_status": result.get("status")
-        }
-
-        await db.suppliers.update_one({"email_domain": email_domain}, {"$set": update_fields})
+        await store_extraction(email_domain, result, file.filename)
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
@@ -76,181 +65,7 @@ async def calculate_and_store_esg_scores(request: EmailRequest):
         email = request.email
         email_domain = email.split('@')[1]
         
-        supplier = await db.suppliers.find_one({"email_domain": email_domain})
-        if not supplier:
-            raise HTTPException(status_code=404, detail="Supplier not found")
-
-        if "esg_upload_result" not in supplier or "esg_overall_data" not in supplier:
-            raise HTTPException(
-                status_code=400, 
-                detail="ESG data not found. Please upload a report first."
-            )
-
-        # 2. Prepare Gemini Input
-        full_input = {
-            "result": supplier["esg_upload_result"],
-            "overall_data": supplier["esg_overall_data"]
-        }
-
-        # --- FORMULA PROMPT ---
-        formula_prompt = f"""
-You are an expert ESG analyst. Compute ESG subfactor scores using these exact formulas:
-
-### Environmental (E) Formulas:
-1. GHG Score = 100 × (1 - (GHG Emissions / 2.85))
-2. Energy Score = 100 × (1 - (Energy Use / 3150))
-3. Water Score = 100 × (1 - (Water Use / 3.85))
-4. Waste Score = 100 × (Waste Recycled / Total Waste)
-5. Compliance Score = 100 - (Environmental Fines × 7.5)
-6. Renewable Score = 100 × (Renewable Energy / Total Energy)
-7. Biodiversity Score = 100 - (Impact Score / 40 × 100)
-8. Climate Risk Score = 100 × (Measures Implemented / 18)
-
-### Social (S) Formulas:
-1. Retention Score = 100 × (1 - (Turnover Rate / 15))
-2. Safety Score = 100 × (1 - (Injury Rate / 3.85))
-3. Diversity Score = 100 × (Diverse Employees / Total Employees)
-4. Community Score = 100 × (Community Investment / Revenue)
-5. Customer Score = Net Promoter Score (scale: -100 to +100)
-6. Human Rights Score = 100 - (Violations × 15)
-7. Training Score = 100 × (Training Hours / 40)
-
-### Governance (G) Formulas:
-1. Board Independence = 100 × (Independent Directors / Total)
-2. Compensation Score = 100 - |(CEO Pay Ratio - 200) / 200 × 100|
-3. Audit Score = 100 × (Independent Audit Members / Total)
-4. Shareholder Score = 100 × (Shareholder Policies / 14)
-5. Transparency Score = 100 × (Disclosed Metrics / 50)
-6. Anti-Corruption = 100 - (Corruption Incidents × 20)
-7. Tax Transparency = 100 × (Disclosed Jurisdictions / Total)
-
-### Instructions:
-1. Use values from "result" first
-2. Fall back to "overall_data" if needed
-3. Return null for unavailable data
-4. Maintain this exact output structure:
-
-{{
-  "Environmental": {{
-    "GHG Score": ...,
-    "Energy Efficiency Score": ...,
-    // All 8 environmental factors
-  }},
-  "Social": {{
-    // All 7 social factors  
-  }},
-  "Governance": {{
-    // All 7 governance factors
-  }}
-}}
-
-Input Data:
-{json.dumps(full_input, indent=2)}
-"""
-
-        # 3. Call Gemini API
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": formula_prompt}]}]
-            },
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        # 4. Process Response
-        reply_content = response.json()["candidates"][0]["content"]["parts"][0]["text"]
-
-        # extract json 
-        def extract_json(text: str) -> dict:
-            """Robust JSON extraction from Gemini response"""
-            try:
-                # Try direct parse first
-                return json.loads(text.strip())
-            except json.JSONDecodeError:
-                # Handle code fence cases
-                text = text.strip()
-                if text.startswith('```') and text.endswith('```'):
-                    text = text[3:-3].strip()
-                    if text.startswith('json'):
-                        text = text[4:].strip()
-                
-                # Find first/last curly braces
-                first_brace = text.find('{')
-                last_brace = text.rfind('}')
-                if first_brace != -1 and last_brace != -1:
-                    return json.loads(text[first_brace:last_brace+1])
-                
-                raise ValueError("No valid JSON found in response")
-
-        try:
-            subfactor_scores = extract_json(reply_content)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail="Could not parse ESG scores from Gemini response"
-            )
-
-        # --- MISSING VALUES PROMPT ---
-        missing_prompt = f"""
-As an ESG expert in automotive manufacturing, fill ONLY null values in this JSON 
-using 2024 industry averages. Preserve all existing values.
-
-Industry Averages Reference:
-- Environmental: Scores typically range 65-85
-- Social: Scores typically range 70-90  
-- Governance: Scores typically range 75-95
-
-Return the completed JSON in this exact structure:
-
-{json.dumps(subfactor_scores, indent=2)}
-"""
-
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        
-        filled_response = model.generate_content(missing_prompt)
-        filled_text = filled_response.text
-
-        try:
-            fixed_scores = extract_json(filled_text)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail="Could not parse completed ESG scores"
-            )
-
-        # 5. Calculate Final Scores
-        E_score = calculate_category_score(fixed_scores["Environmental"])
-        S_score = calculate_category_score(fixed_scores["Social"])
-        G_score = calculate_category_score(fixed_scores["Governance"])
-        ESG_score = round(0.4 * E_score + 0.35 * S_score + 0.25 * G_score, 2)
-     
-        # 6. Update Database
-        await db.suppliers.update_one(
-            {"email_domain": email_domain},
-            {"$set": {
-                "esg_subfactor_scores": fixed_scores,
-                "esg_E_score": E_score,
-                "esg_S_score": S_score,
-                "esg_G_score": G_score,
-                "esg_final_score": ESG_score,
-                "last_updated": datetime.utcnow()
-            }}
-        )
-
-        return {
-            "final_subfactor_scores": fixed_scores,
-            "E_score": E_score,
-            "S_score": S_score,
-            "G_score": G_score,
-            "ESG_score": ESG_score
-        }
-
+        return await score_supplier(email_domain)
     except HTTPException:
         raise
     except Exception as e:
@@ -264,18 +79,82 @@ async def get_esg_prefill(request: Request):
         raise HTTPException(status_code=400, detail="Email header is required")
 
     email_domain = email.split('@')[1]
-    supplier = await db.suppliers.find_one({"email_domain": email_domain})
+    supplier = await tenants.supplier(email_domain)
+    extraction = await extraction_store.load(supplier) if supplier else None
 
-    if not supplier or "esg_upload_result" not in supplier:
+    if not extraction:
         raise HTTPException(status_code=404, detail="No ESG data found")
 
     return {
         "status": "success",
-        "result": supplier["esg_upload_result"],
-        "overall_data": supplier.get("esg_overall_data", {})
+        "result": extraction["result"],
+        "overall_data": extraction["overall_data"]
     }
 
 
+# ---------- 3. BULK RESCORE ----------
+class RescoreRequest(BaseModel):
+    profile: Optional[str] = None  # force one weight profile instead of each supplier's industry profile
+    weights: Optional[Dict[str, float]] = None  # or explicit {"Environmental", "Social", "Governance"} weights
+    industry: Optional[str] = None  # only rescore suppliers of this industry
+    dry_run: bool = False
+
+@router.get("/esg-weight-profiles")
+async def get_esg_weight_profiles():
+    return WEIGHT_PROFILES
+
+@router.post("/rescore-esg")
+async def rescore_esg(request: RescoreRequest):
+    """Recompute the ESG scores of all scored suppliers in one vectorized pass (e.g. after a weight change)."""
+    return await rescore_all(
+        profile=request.profile,
+        weights=request.weights,
+        industry=request.industry,
+        dry_run=request.dry_run,
+    )
+
+
+# ---------- 4. PEER STATISTICS (imputation of missing subfactors) ----------
+@router.get("/esg-peer-stats")
+async def get_esg_peer_stats(industry: Optional[str] = None):
+    return await peer_stats.summary(industry)
+
+@router.post("/esg-peer-stats/rebuild")
+async def rebuild_esg_peer_stats():
+    return await peer_stats.rebuild()
+
+# ---------- 5. SCORE HISTORY (monitoring trends) ----------
+def check_interval(interval: str):
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=422, detail=f"interval must be one of {list(INTERVALS)}")
+
+@router.get("/esg-history")
+async def get_portfolio_esg_history(
+    industry: Optional[str] = None,
+    interval: str = "month",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Min/max/avg ESG scores per day, week or month across all suppliers (or one industry)."""
+    check_interval(interval)
+    series = await score_history.portfolio_trend(industry, interval, start, end)
+    return {"industry": industry, "interval": interval, "series": series}
+
+@router.get("/esg-history/{email_domain}")
+async def get_supplier_esg_history(
+    email_domain: str,
+    interval: str = "week",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """One supplier's ESG scores per day, week or month: min/max/avg/last and the number of scorings."""
+    check_interval(interval)
+    supplier = await tenants.supplier(email_domain)
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    series = await score_history.supplier_trend(supplier["_id"], interval, start, end)
+    return {"email_domain": email_domain, "interval": interval, "series": series}
+
 # #------------------- old routes we used  -------------------
 
 # @app.post("/api/upload-esg-report")
@@ -539,6 +418,7 @@ async def get_esg_prefill(request: Request):
     
 
 # from typing import Dict, Any, Optional
+from datetime import datetime
 # import statistics
 
 
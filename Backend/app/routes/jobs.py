@@ -0,0 +1,87 @@
+import os
+import json
+import asyncio
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.services.job_queue import job_queue, TERMINAL_STATUSES
+from app.services.esg_pipeline import run_report_job, run_score_job
+from app.services.tenants import tenants
+from app.utils.serializers import serialize_mongo_document
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+job_queue.register("esg_report", run_report_job)
+job_queue.register("esg_score", run_score_job)
+
+# How often the event stream re-reads the job document
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "1"))
+
+
+class EmailRequest(BaseModel):
+    email: str
+
+
+async def _require_supplier(email: str) -> str:
+    if not email or "@" not in email:
+        raise HTTPException(status_code=422, detail="Invalid email format")
+    email_domain = email.split('@')[1]
+    if not await tenants.supplier(email_domain):
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    return email_domain
+
+
+@router.post("/esg-report", status_code=202)
+async def submit_esg_report_job(file: UploadFile = File(...), email: str = Form(...), score: bool = Form(True)):
+    """Queue extraction (and optionally scoring) of an ESG report; returns a job id at once."""
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in ['.pdf', '.docx']:
+        raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
+
+    email_domain = await _require_supplier(email)
+    job_id = await job_queue.submit(
+        "esg_report",
+        {"email_domain": email_domain, "filename": file.filename, "score": score},
+        upload=await file.read(),
+        filename=file.filename,
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/esg-score", status_code=202)
+async def submit_esg_score_job(request: EmailRequest):
+    """Queue calculation of a supplier's ESG scores; returns a job id at once."""
+    email_domain = await _require_supplier(request.email)
+    job_id = await job_queue.submit("esg_score", {"email_domain": email_domain})
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_mongo_document(job)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events stream of the job document, one event per change, until it finishes."""
+    if not await job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_update = None
+        while True:
+            job = await job_queue.get(job_id)
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                data = json.dumps(jsonable_encoder(serialize_mongo_document(job)))
+                yield f"event: {job['status']}\ndata: {data}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
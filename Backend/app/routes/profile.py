@@ -1,6 +1,8 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
 from app.auth.jwt import get_current_user_from_token
 from app.database import db
+from app.services.tenants import tenants
 from app.schemas.auth_schemas import ProfileUpdate
 from app.utils.serializers import serialize_mongo_document
 from typing import Dict, Any
@@ -15,8 +17,13 @@ async def get_profile(current_user: Dict = Depends(get_current_user_from_token))
         if not user_email:
             raise HTTPException(status_code=400, detail="Invalid token payload")
 
-        # Find user in database
-        user = await db.users.find_one({"email": user_email})
+        # The token's role tells which tenant collection to look in, so user and tenant are
+        # fetched concurrently (and usually from the tenant cache)
+        token_role = current_user.get("role")
+        user, company_doc = await asyncio.gather(
+            tenants.user(user_email),
+            tenants.tenant_of(token_role, user_email),
+        )
         if not user:
             raise HTTPException(status_code=404, detail="User not found in database")
 
@@ -27,10 +34,9 @@ async def get_profile(current_user: Dict = Depends(get_current_user_from_token))
         
         # Find company based on email domain and role
         company_name = "Not found"
-        if user["role"].lower() == "supplier":
-            company_doc = await db.suppliers.find_one({"email_domain": email_domain})
-        else:
-            company_doc = await db.companies.find_one({"email_domain": email_domain})
+        if (user["role"] or "").lower() != (token_role or "").lower():
+            # role changed since the token was issued
+            company_doc = await tenants.tenant_of(user["role"], user_email)
         
         if company_doc:
             company_doc = serialize_mongo_document(company_doc)
@@ -65,7 +71,7 @@ async def update_profile(
         print(f"Attempting to update user: {user_email}")
 
         # First, verify user exists
-        existing_user = await db.users.find_one({"email": user_email})
+        existing_user = await tenants.user(user_email)
         if not existing_user:
             print(f"User {user_email} not found in database")
             raise HTTPException(status_code=404, detail=f"User {user_email} not found")
@@ -87,6 +93,7 @@ async def update_profile(
         )
 
         print(f"Update result: matched={result.matched_count}, modified={result.modified_count}")
+        tenants.invalidate_user(user_email)
 
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found during update operation")
@@ -101,3 +108,9 @@ async def update_profile(
     except Exception as e:
         print(f"Profile update error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error updating profile: {str(e)}")
+
+
+@router.get("/cache-stats")
+async def get_tenant_cache_stats():
+    """Hit rate of the user/tenant lookup cache behind the profile and auth routes."""
+    return tenants.stats()
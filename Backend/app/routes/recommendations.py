@@ -1,381 +1,235 @@
 from fastapi import APIRouter , HTTPException
-from pydantic import BaseModel
-import requests
-import os
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+import asyncio
+import json
 import re
+import time
+from app.services.gemini_client import generate_content, GeminiError
+from app.services.llm_cache import recommendation_cache
 
 class GeminiRecommendationRequest(BaseModel):
     prompt: str
 
 router = APIRouter( )
 
+# ---------- PROMPTS ----------
+ESG_SCORES_PROMPT = (
+    "You are an expert ESG consultant. "
+    "Given the following ESG category scores, suggest actionable techniques to improve these scores. "
+    "Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
+    "Give response in three different points, Environmental, Social, Governance. In these points, make subpoints which suggest improvements."
+    "Give only normal text with no bold words, no special characters."
+)
+
+TARGET_SCORE_PROMPT = (
+    "You are an expert ESG consultant. "
+    "Given the following Current {label} score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
+    "Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
+    "Give only normal text with no bold words, no special characters."
+)
+
+REMAINING_SCORES_PROMPT = (
+    "You are an expert Cost Efficiency score, Risk Score, Reliability Score teller out of 100 for a sustainable Procurement Optimizer Platform. "
+    "Given the following company name and year for a supplier, give me just the Cost Efficiency score, Risk Score, Reliability Score for that company for a particular year out of 100."
+    "Give only numerical scores with no explanation out of 100."
+)
+
+# Category keys as used in the /api/gemini-recommendations-{key}Score paths
+CATEGORY_LABELS = {
+    "e": "Environmental",
+    "s": "Social",
+    "g": "Governance",
+    "c": "Cost",
+    "ri": "Risk",
+    "re": "Reliability",
+}
+
+# ---------- HELPERS ----------
+def split_points(reply_content: str) -> List[str]:
+    # Split the response into points (handles bullets, numbers, or newlines)
+    return [
+        p.strip("•- \n\r\t")
+        for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
+        if p.strip()
+    ]
+
+
+def build_prompt(category: str, prompt: str) -> str:
+    if category == "esg":
+        return ESG_SCORES_PROMPT + prompt
+    return TARGET_SCORE_PROMPT.format(label=CATEGORY_LABELS[category]) + prompt
+
+
+async def ask_gemini(full_prompt: str) -> List[str]:
+    # Gemini 1.5 Flash through the shared async client
+    try:
+        reply_content = await generate_content(full_prompt)
+    except GeminiError as e:
+        raise HTTPException(status_code=500, detail="Gemini API failed: " + e.text)
+    return split_points(reply_content)
+
+
+async def get_recommendations(kind: str, full_prompt: str) -> List[str]:
+    points = await recommendation_cache.get_or_compute(kind, full_prompt, lambda: ask_gemini(full_prompt))
+    return list(points)
+
+
+async def recommendation_response(kind: str, full_prompt: str):
+    try:
+        return {"recommendations": await get_recommendations(kind, full_prompt)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
+
+
+# ---------- PER-CATEGORY ENDPOINTS ----------
 @router.post("/api/gemini-recommendations-esgScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
-
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following ESG category scores, suggest actionable techniques to improve these scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give response in three different points, Environmental, Social, Governance. In these points, make subpoints which suggest improvements."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
+    return await recommendation_response("esg", build_prompt("esg", request.prompt))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
-   
-class GeminiRecommendationRequest(BaseModel):
-    prompt: str
 
 @router.post("/api/gemini-recommendations-eScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
-
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Environmental score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
+    return await recommendation_response("e", build_prompt("e", request.prompt))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
 
 @router.post("/api/gemini-recommendations-sScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
+    return await recommendation_response("s", build_prompt("s", request.prompt))
 
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Social score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
 
 @router.post("/api/gemini-recommendations-gScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
+    return await recommendation_response("g", build_prompt("g", request.prompt))
 
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Governance score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
-
-    
 @router.post("/api/gemini-recommendations-cScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
-    Accepts a prompt, sends to Gemini, and returns improvement suggestions as points.
+    Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
+    return await recommendation_response("c", build_prompt("c", request.prompt))
 
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Cost score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
 @router.post("/api/gemini-recommendations-riScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
-
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Risk score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
+    return await recommendation_response("ri", build_prompt("ri", request.prompt))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
 
 @router.post("/api/gemini-recommendations-reScore")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt (should include esg_category_scores in the text), sends to Gemini, and returns improvement suggestions as points.
     """
-    import re
+    return await recommendation_response("re", build_prompt("re", request.prompt))
 
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert ESG consultant. "
-            f"Given the following Current Reliability score and Target Score that supplier want to reach, suggest actionable techniques to reach target scores. "
-            f"Respond as a concise list of improvement points, each as a separate bullet:\n\n. Response everything in normal text, no bold or italic test."
-            f"Give only normal text with no bold words, no special characters."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
-    
+# ---------- UNIFIED STREAMING ENDPOINT ----------
+class CategoryTarget(BaseModel):
+    category: Literal["esg", "e", "s", "g", "c", "ri", "re"]
+    current_score: Optional[float] = None
+    target_score: Optional[float] = None
+    prompt: Optional[str] = None  # free text instead of the scores, e.g. the esg category scores
+
+
+class UnifiedRecommendationRequest(BaseModel):
+    categories: List[CategoryTarget] = Field(..., min_length=1, max_length=len(CATEGORY_LABELS) + 1)
+
+    @field_validator("categories")
+    @classmethod
+    def categories_are_unique(cls, categories: List[CategoryTarget]) -> List[CategoryTarget]:
+        # one SSE event per category: a repeated category would silently replace the earlier one
+        seen = set()
+        for target in categories:
+            if target.category in seen:
+                raise ValueError(f"category {target.category} is listed more than once")
+            seen.add(target.category)
+        return categories
+
+
+def category_prompt(target: CategoryTarget) -> str:
+    if target.prompt is not None:
+        return target.prompt
+    if target.category == "esg":
+        raise HTTPException(status_code=422, detail="The esg category needs a prompt with the category scores")
+    if target.current_score is None or target.target_score is None:
+        raise HTTPException(status_code=422, detail=f"current_score and target_score are required for {target.category}")
+    # Same wording the dashboard uses for the per-category endpoints
+    return f"Current {CATEGORY_LABELS[target.category]} score: {target.current_score} and Target Score is: {target.target_score}"
+
 
-    
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/api/gemini-recommendations")
+async def gemini_recommendations_stream(request: UnifiedRecommendationRequest):
+    """
+    Fans the prompts of all requested categories out to Gemini concurrently and streams each
+    category's recommendations as a Server-Sent Event as soon as it completes.
+    """
+    prompts = {target.category: build_prompt(target.category, category_prompt(target)) for target in request.categories}
+
+    async def run(category: str, full_prompt: str):
+        try:
+            return category, await get_recommendations(category, full_prompt), None
+        except HTTPException as e:
+            return category, None, e.detail
+        except Exception as e:
+            return category, None, f"Error calling Gemini: {str(e)}"
+
+    async def events():
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(run(category, full_prompt)) for category, full_prompt in prompts.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                category, points, error = await finished
+                elapsed_ms = round((time.perf_counter() - started) * 1000)
+                if error:
+                    yield sse_event("error", {"category": category, "detail": error, "elapsed_ms": elapsed_ms})
+                else:
+                    yield sse_event("recommendations", {"category": category, "recommendations": points, "elapsed_ms": elapsed_ms})
+            yield sse_event("done", {"elapsed_ms": round((time.perf_counter() - started) * 1000)})
+        finally:
+            # client went away: don't keep paying for the remaining prompts
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# ---------- REMAINING SCORES ----------
 @router.post("/api/calculate-RemainingScores")
 async def gemini_recommendations(request: GeminiRecommendationRequest):
     """
     Accepts a prompt, sends to Gemini, and returns required scores for a company for a paritcular year.
     """
-    import re
+    return await recommendation_response("remaining", REMAINING_SCORES_PROMPT + request.prompt)
 
-    try:
-        # Compose the prompt for Gemini
-        full_prompt = (
-            f"You are an expert Cost Efficiency score, Risk Score, Reliability Score teller out of 100 for a sustainable Procurement Optimizer Platform. "
-            f"Given the following company name and year for a supplier, give me just the Cost Efficiency score, Risk Score, Reliability Score for that company for a particular year out of 100."
-            f"Give only numerical scores with no explanation out of 100."
-            f"{request.prompt}"
-        )
-
-        # Use Gemini 1.5 Flash API (as in your other endpoints)
-        response = requests.post(
-            url="https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            params={"key": os.getenv("GEMINI_API_KEY")},
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{"role": "user", "parts": [{"text": full_prompt}]}]
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Gemini API failed: " + response.text)
-
-        gemini_output = response.json()
-        reply_content = gemini_output["candidates"][0]["content"]["parts"][0]["text"]
-
-        # Split the response into points (handles bullets, numbers, or newlines)
-        points = [
-            p.strip("•- \n\r\t")
-            for p in re.split(r"(?:\n|^)[•\-–\d.]+\s*", reply_content)
-            if p.strip()
-        ]
-
-        return {"recommendations": points}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling Gemini: {str(e)}")
- 
\ No newline at end of file
+# ---------- CACHE ----------
+@router.get("/api/recommendations/cache")
+async def get_recommendation_cache_stats():
+    return recommendation_cache.stats()
+
+
+@router.delete("/api/recommendations/cache")
+async def invalidate_recommendation_cache(kind: Optional[str] = None):
+    """Drop cached recommendations, optionally only one kind (esg, e, s, g, c, ri, re, remaining)."""
+    return {"success": True, "removed": recommendation_cache.invalidate(kind)}
@@ -0,0 +1,549 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.database import db
+from app.utils.serializers import serialize_mongo_document
+from app.services.supplier_store import supplier_store, CRITERIA, COLUMNS, NEUTRAL_SCORE
+from app.services.supplier_search import supplier_search
+from app.services.skyline import skyline_layers
+from app.services import scenarios
+from app.services.allocation import AllocationProblem, AllocationError, solve
+
+router = APIRouter(prefix="/api/suppliers", tags=["Suppliers"])
+
+MAX_PAGE_SIZE = 500
+
+
+# ---------- LISTING ----------
+# Raw extraction output still inline on suppliers not yet moved to esg_extractions; ask with fields=all or by name
+HEAVY_FIELDS = ("esg_upload_result", "esg_overall_data")
+# Documents per round trip while streaming; bounds the memory held per request
+SUPPLIERS_BATCH_SIZE = int(os.getenv("SUPPLIERS_BATCH_SIZE", "100"))
+MAX_LIST_PAGE_SIZE = 1000
+
+
+def list_projection(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    if fields is None:
+        return {name: 0 for name in HEAVY_FIELDS}
+    if fields == "all":
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if not names or any(name.startswith("$") for name in names):
+        raise HTTPException(status_code=422, detail="fields must be a comma-separated list of field names, or 'all'")
+    return {name: 1 for name in names}
+
+
+def keyset_query(after: Optional[str]) -> Dict[str, Any]:
+    if after is None:
+        return {}
+    if not ObjectId.is_valid(after):
+        raise HTTPException(status_code=422, detail="after must be the id of the last supplier of the previous page")
+    return {"_id": {"$gt": ObjectId(after)}}
+
+
+async def list_fingerprint(query: Dict[str, Any], limit: Optional[int]) -> str:
+    """Cheap version stamp of what a listing would return, read from indexed _id / last_updated only.
+
+    A page is identified by its ids and their last_updated; the whole collection by its size,
+    newest _id and latest last_updated. Relies on every supplier write setting last_updated.
+    """
+    if limit is not None:
+        docs = await db.suppliers.find(query, {"last_updated": 1}).sort("_id", 1).limit(limit).to_list(length=limit)
+        parts = [(doc["_id"], doc.get("last_updated")) for doc in docs]
+    else:
+        newest = await db.suppliers.find(query, {"_id": 1}).sort("_id", -1).limit(1).to_list(length=1)
+        touched = await db.suppliers.find(query, {"last_updated": 1}).sort("last_updated", -1).limit(1).to_list(length=1)
+        parts = [
+            await db.suppliers.count_documents(query),
+            newest[0]["_id"] if newest else None,
+            touched[0].get("last_updated") if touched else None,
+        ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+def supplier_json(supplier: Dict[str, Any]) -> str:
+    supplier["id"] = str(supplier.pop("_id"))
+    return json.dumps(jsonable_encoder(serialize_mongo_document(supplier)))
+
+
+@router.get("")
+async def list_suppliers(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIST_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="id of the last supplier of the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated fields to return, or 'all'"),
+    format: str = Query("json", description="json, or ndjson for one supplier per line"),
+):
+    """
+    Suppliers in _id order, streamed from the cursor as they are read. Without limit, the whole
+    collection ({"suppliers": [...]} as before); with limit, one keyset page whose next_cursor
+    goes into ?after= for the next one (in ndjson, the id of the last line). The raw extraction
+    blobs are left out unless requested through fields. Responses carry an ETag, and a matching
+    If-None-Match gets an empty 304.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be 'json' or 'ndjson'")
+    projection = list_projection(fields)
+    query = keyset_query(after)
+
+    etag = hashlib.sha1(
+        repr((await list_fingerprint(query, limit), limit, after, projection, format)).encode()
+    ).hexdigest()
+    etag = f'W/"{etag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cursor = db.suppliers.find(query, projection).sort("_id", 1).batch_size(SUPPLIERS_BATCH_SIZE)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+
+    async def ndjson_lines():
+        async for supplier in cursor:
+            yield supplier_json(supplier) + "\n"
+
+    async def json_body():
+        yield '{"suppliers": ['
+        count, last_id = 0, None
+        async for supplier in cursor:
+            last_id = supplier["_id"]
+            yield ("," if count else "") + supplier_json(supplier)
+            count += 1
+        # a full page may be followed by an empty one; that's the price of not counting ahead
+        next_cursor = str(last_id) if limit is not None and count == limit else None
+        yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
+
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(json_body(), media_type="application/json", headers=headers)
+
+
+# ---------- RANKING ----------
+@router.get("/rank")
+async def rank_suppliers(
+    cost: float = Query(25, ge=0),
+    sustainability: float = Query(25, ge=0),
+    risk: float = Query(25, ge=0),
+    reliability: float = Query(25, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    industry: Optional[str] = None,
+):
+    """
+    Rank suppliers by the trade-off simulator's weighted overall score and return one page.
+    Weights are percentages as on the simulator sliders; risk counts as 100 - risk.
+    """
+    weights = {"cost": cost, "sustainability": sustainability, "risk": risk, "reliability": reliability}
+    if not any(weights.values()):
+        raise HTTPException(status_code=422, detail="At least one weight must be positive")
+
+    started = time.perf_counter()
+    rows, scores, total = supplier_store.top(weights, limit, offset, supplier_store.mask(industry))
+    suppliers = [
+        {**supplier_store.row(i), "overallScore": round(float(score), 2), "rank": offset + n + 1}
+        for n, (i, score) in enumerate(zip(rows.tolist(), scores.tolist()))
+    ]
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "weights": weights,
+        "criteria_fields": CRITERIA,
+        "suppliers": suppliers,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+# ---------- FILTER / AGGREGATE ----------
+def range_filters(request: Request) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """min_<column>=… / max_<column>=… query parameters, e.g. ?min_ESG_score=60&max_risk=30"""
+    ranges = {}
+    for name, value in request.query_params.items():
+        bound, _, column = name.partition("_")
+        if bound not in ("min", "max") or not column:
+            continue
+        if column not in COLUMNS:
+            raise HTTPException(status_code=422, detail=f"Unknown column {column!r}; expected one of {list(COLUMNS)}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"{name} must be a number")
+        low, high = ranges.get(column, (None, None))
+        ranges[column] = (number, high) if bound == "min" else (low, number)
+    return ranges
+
+
+@router.get("/filter")
+async def filter_suppliers(
+    request: Request,
+    industry: Optional[str] = None,
+    sort: str = Query("-ESG_score", description="column to sort by, prefix with - for descending"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+):
+    """Suppliers matching an industry and min_/max_ column ranges, sorted by one column."""
+    column = sort.lstrip("-")
+    if column not in COLUMNS:
+        raise HTTPException(status_code=422, detail=f"Cannot sort by {column!r}; expected one of {list(COLUMNS)}")
+
+    started = time.perf_counter()
+    mask = supplier_store.mask(industry, range_filters(request))
+    values = supplier_store.column(column)
+    rows, _, total = supplier_store.top_by(values if sort.startswith("-") else -values, limit, offset, mask)
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "suppliers": [supplier_store.row(i) for i in rows.tolist()],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.get("/aggregate")
+async def aggregate_suppliers(request: Request, industry: Optional[str] = None, group_by: Optional[str] = "industry"):
+    """count / mean / min / max / median of every score, per industry (group_by=industry) or overall."""
+    if group_by not in (None, "", "industry", "none"):
+        raise HTTPException(status_code=422, detail="group_by must be 'industry' or 'none'")
+    started = time.perf_counter()
+    mask = supplier_store.mask(industry, range_filters(request))
+    groups = supplier_store.aggregate(mask, group_by_industry=group_by == "industry")
+    return {"groups": groups, "took_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+# ---------- SEARCH ----------
+@router.get("/search")
+async def search_suppliers(
+    request: Request,
+    q: str = "",
+    industry: List[str] = Query([]),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Fuzzy (trigram) search on company names, typeahead-friendly: the last word matches as a prefix.
+    Without q, browses all suppliers, best ESG score first. Filter with one or more industry=… and
+    min_/max_ column ranges as in /filter. Facets give the number of results per industry and per
+    20-point score band, each ignoring its own filter.
+    """
+    started = time.perf_counter()
+    result = supplier_search.search(q, industry, range_filters(request), limit, offset)
+    return {
+        "query": q,
+        "total": result["total"],
+        "offset": offset,
+        "limit": limit,
+        "suppliers": [
+            {**supplier_store.get(key), "match_score": round(score, 4)}
+            for key, score in result["matches"]
+            if key in supplier_store.position
+        ],
+        "facets": result["facets"],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+# ---------- PARETO FRONTIER ----------
+MAX_SKYLINE_LAYERS = 5
+
+@router.get("/skyline")
+async def supplier_skyline(
+    request: Request,
+    industry: Optional[str] = None,
+    objectives: str = Query(",".join(CRITERIA), description="comma-separated subset of cost,sustainability,risk,reliability"),
+    layers: int = Query(1, ge=1, le=MAX_SKYLINE_LAYERS),
+):
+    """
+    Suppliers no other supplier beats on every objective (higher cost efficiency, sustainability and
+    reliability, lower risk), optionally followed by the next frontier layers. Filters as in /filter,
+    e.g. ?industry=automotive&min_ESG_score=60.
+    """
+    criteria = tuple(name.strip() for name in objectives.split(",") if name.strip())
+    unknown = [name for name in criteria if name not in CRITERIA]
+    if unknown or not criteria:
+        raise HTTPException(status_code=422, detail=f"objectives must be a subset of {list(CRITERIA)}")
+
+    started = time.perf_counter()
+    mask = supplier_store.mask(industry, range_filters(request))
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(supplier_store.size)
+    points = supplier_store.criteria_matrix(criteria)[rows]
+    fronts = skyline_layers(points, layers)
+    return {
+        "objectives": criteria,
+        "candidates": int(len(rows)),
+        "layers": [
+            {"layer": n + 1, "size": int(len(front)), "suppliers": [supplier_store.row(i) for i in rows[front].tolist()]}
+            for n, front in enumerate(fronts)
+        ],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+# ---------- SCENARIOS ----------
+class TradeOffWeights(BaseModel):
+    cost: float = Field(25, ge=0)
+    sustainability: float = Field(25, ge=0)
+    risk: float = Field(25, ge=0)
+    reliability: float = Field(25, ge=0)
+
+
+class DirichletSampling(BaseModel):
+    samples: int = Field(1000, ge=1, le=20000)
+    concentration: float = Field(50, gt=0)  # higher → samples closer to the current weights
+    seed: Optional[int] = None
+
+
+class ScenarioRequest(BaseModel):
+    current: TradeOffWeights = TradeOffWeights()
+    presets: Optional[List[str]] = None  # preset names, [] for none; default all simulator presets
+    weights: List[TradeOffWeights] = []  # explicit weight vectors
+    grid_step: Optional[int] = Field(None, ge=5, le=50)  # every vector in steps of grid_step summing to 100; must divide 100
+    dirichlet: Optional[DirichletSampling] = None
+    industry: Optional[str] = None
+    top_k: int = Field(5, ge=1, le=100)
+    limit: int = Field(20, ge=1, le=MAX_PAGE_SIZE)  # suppliers in the answer, most often in the top-k first
+
+
+@router.post("/scenarios")
+async def evaluate_scenarios(request: ScenarioRequest):
+    """
+    Rank all suppliers under many weight vectors at once (presets, explicit vectors, a grid and/or
+    Dirichlet samples around the current weights) and report how stable each supplier's rank is:
+    rank distribution, probability of landing in the top-k, and the weight changes that would make
+    neighbouring suppliers under the current weights swap places.
+    """
+    preset_names = list(scenarios.PRESETS) if request.presets is None else request.presets
+    unknown = [name for name in preset_names if name not in scenarios.PRESETS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown presets {unknown}; expected some of {list(scenarios.PRESETS)}")
+    if request.grid_step and 100 % request.grid_step:
+        raise HTTPException(status_code=422, detail="grid_step must divide 100 (e.g. 5, 10, 20, 25 or 50)")
+
+    started = time.perf_counter()
+    current = scenarios.weight_vector(request.current.dict())
+    if not current.any():
+        raise HTTPException(status_code=422, detail="current weights must not all be zero")
+    sources = {
+        "presets": np.array([scenarios.weight_vector(scenarios.PRESETS[name]) for name in preset_names]).reshape(-1, 4),
+        "weights": np.array([scenarios.weight_vector(w.dict()) for w in request.weights]).reshape(-1, 4),
+        "grid": scenarios.grid_weights(request.grid_step) if request.grid_step else np.empty((0, 4)),
+        "dirichlet": scenarios.dirichlet_weights(
+            current, request.dirichlet.samples, request.dirichlet.concentration, request.dirichlet.seed
+        ) if request.dirichlet else np.empty((0, 4)),
+    }
+    weights = np.vstack([current[None, :]] + list(sources.values()))  # scenario 0 is the current weights
+
+    mask = supplier_store.mask(request.industry)
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(supplier_store.size)
+    if not len(rows):
+        raise HTTPException(status_code=404, detail="No suppliers match")
+    if len(rows) * len(weights) > scenarios.SCENARIO_MAX_CELLS:
+        raise HTTPException(status_code=422, detail=f"{len(rows)} suppliers × {len(weights)} scenarios is too many")
+
+    points = supplier_store.criteria_matrix(scenarios.CRITERIA_ORDER)[rows]
+    scores, ranks = scenarios.rank_matrix(points, weights)
+    stats = scenarios.rank_statistics(ranks, request.top_k)
+    computed = time.perf_counter()
+
+    # most often in the top-k first, then by mean rank
+    shown = np.lexsort((stats["mean"], -stats["top_k_probability"]))[:request.limit]
+    stats.update(scenarios.rank_percentiles(ranks[:, shown]))
+    current_order = np.argsort(ranks[0])
+    flip_order = current_order[:request.top_k + 1]
+    flips = scenarios.rank_flips(points, current, flip_order)
+
+    preset_offset = 1
+    return {
+        "suppliers_evaluated": int(len(rows)),
+        "scenarios": int(len(weights)),
+        "scenario_sources": {name: int(len(vectors)) for name, vectors in sources.items()},
+        "top_k": request.top_k,
+        "suppliers": [
+            {
+                **supplier_store.row(rows[i]),
+                "current_rank": int(ranks[0, i]) + 1,
+                "current_score": round(float(scores[0, i]), 2),
+                "top_k_probability": round(float(stats["top_k_probability"][i]), 4),
+                "rank": {
+                    "mean": round(float(stats["mean"][i]), 2),
+                    "median": float(stats["median"][n]),
+                    "p5": float(stats["p5"][n]),
+                    "p95": float(stats["p95"][n]),
+                    "min": int(stats["min"][i]),
+                    "max": int(stats["max"][i]),
+                },
+            }
+            for n, i in enumerate(shown.tolist())
+        ],
+        "presets": {
+            name: [
+                supplier_store.keys[rows[i]]
+                for i in np.argsort(ranks[preset_offset + n])[:request.top_k].tolist()
+            ]
+            for n, name in enumerate(preset_names)
+        },
+        # weight change (percentage points, others unchanged) at which rank r+1 overtakes rank r
+        "rank_flips": [
+            {
+                "rank": n + 1,
+                "upper": supplier_store.keys[rows[flip_order[n]]],
+                "lower": supplier_store.keys[rows[flip_order[n + 1]]],
+                "weight_change": thresholds,
+            }
+            for n, thresholds in enumerate(flips)
+        ],
+        "compute_ms": round((computed - started) * 1000, 3),
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+# ---------- ALLOCATION ----------
+class CostMetrics(BaseModel):
+    production_cost_per_unit: Optional[float] = Field(None, ge=0)
+    logistics_cost_per_unit: Optional[float] = Field(None, ge=0)
+    capacity: Optional[float] = Field(None, ge=0)  # units per planning period
+
+
+class SupplierOffer(CostMetrics):
+    email_domain: str
+
+
+class AllocationRequest(BaseModel):
+    demand: float = Field(..., gt=0)
+    min_esg: Optional[float] = Field(None, ge=0, le=100)  # volume-weighted portfolio ESG score
+    max_risk: Optional[float] = Field(None, ge=0, le=100)  # volume-weighted portfolio risk score
+    max_share: Optional[float] = Field(None, gt=0, le=100)  # percent of demand per supplier
+    max_suppliers: Optional[int] = Field(None, ge=1)
+    min_order: Optional[float] = Field(None, gt=0)  # smallest quantity worth ordering from a supplier
+    industry: Optional[str] = None
+    offers: List[SupplierOffer] = []  # per-request capacity / cost figures, overriding the stored ones
+    offers_only: bool = False  # allocate among the offers only
+
+
+@router.put("/{email_domain}/cost-metrics")
+async def update_cost_metrics(email_domain: str, metrics: CostMetrics):
+    """Store a supplier's unit costs and capacity, the inputs of the allocation optimizer."""
+    update = metrics.dict(exclude_unset=True)
+    if not update:
+        raise HTTPException(status_code=422, detail="No cost metrics given")
+    result = await db.suppliers.update_one(
+        {"email_domain": email_domain}, {"$set": {**update, "last_updated": datetime.utcnow()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    await supplier_store.refresh(email_domain)
+    return {"email_domain": email_domain, **update}
+
+
+def allocation_candidates(request: AllocationRequest):
+    """Store rows to allocate among, with their (unit cost, capacity) after applying the offers."""
+    unknown = [offer.email_domain for offer in request.offers if offer.email_domain not in supplier_store.position]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown suppliers {unknown[:10]}")
+
+    production = supplier_store.column("production_cost").copy()
+    logistics = supplier_store.column("logistics_cost").copy()
+    capacity = supplier_store.column("capacity").copy()
+    for offer in request.offers:
+        i = supplier_store.position[offer.email_domain]
+        for values, value in ((production, offer.production_cost_per_unit),
+                              (logistics, offer.logistics_cost_per_unit), (capacity, offer.capacity)):
+            if value is not None:
+                values[i] = value
+
+    mask = supplier_store.mask(request.industry)
+    if request.offers_only:
+        offered = np.zeros(supplier_store.size, dtype=bool)
+        offered[[supplier_store.position[offer.email_domain] for offer in request.offers]] = True
+        mask = offered if mask is None else mask & offered
+    # without a production cost or capacity there is nothing to allocate; missing logistics cost counts as 0
+    usable = ~np.isnan(production) & (np.nan_to_num(capacity) > 0)
+    rows = np.flatnonzero(usable if mask is None else usable & mask)
+    return rows, (production + np.nan_to_num(logistics))[rows], capacity[rows]
+
+
+@router.post("/allocate")
+async def allocate_volume(request: AllocationRequest):
+    """
+    Split a demand quantity over suppliers at minimum total unit cost (production + logistics cost
+    per unit), within each supplier's capacity and an optional max share of demand, keeping the
+    volume-weighted portfolio ESG score above min_esg and risk below max_risk. max_suppliers and
+    min_order make it a mixed-integer problem. Reports solve time and which constraints bind.
+    Suppliers without an ESG or risk score count as neutral, as in the rankings.
+    """
+    started = time.perf_counter()
+    rows, unit_cost, capacity = allocation_candidates(request)
+    problem = AllocationProblem(
+        demand=request.demand,
+        unit_cost=unit_cost,
+        capacity=capacity,
+        esg=np.nan_to_num(supplier_store.column("ESG_score")[rows], nan=NEUTRAL_SCORE),
+        risk=np.nan_to_num(supplier_store.column("risk")[rows], nan=NEUTRAL_SCORE),
+        min_esg=request.min_esg,
+        max_risk=request.max_risk,
+        max_share=request.max_share / 100 if request.max_share is not None else None,
+        max_suppliers=request.max_suppliers,
+        min_order=request.min_order,
+    )
+    try:
+        result = await asyncio.to_thread(solve, problem)
+    except AllocationError as e:
+        raise HTTPException(status_code=422, detail={"message": e.message, "reasons": e.diagnostics})
+
+    quantities = result["quantities"]
+    used = np.flatnonzero(quantities)
+    used = used[np.argsort(-quantities[used], kind="stable")]
+    for constraint in result["constraints"]:
+        # candidate positions → supplier keys
+        if "suppliers" in constraint:
+            constraint["suppliers"] = [supplier_store.keys[rows[i]] for i in constraint["suppliers"]]
+    return {
+        "status": result["status"],
+        "solver": result["solver"],
+        "candidates": int(len(rows)),
+        "demand": request.demand,
+        "total_cost": round(result["total_cost"], 2),
+        "average_unit_cost": round(result["total_cost"] / request.demand, 4),
+        "portfolio": {
+            "ESG_score": round(float(problem.esg @ quantities / request.demand), 2),
+            "risk": round(float(problem.risk @ quantities / request.demand), 2),
+        },
+        "allocation": [
+            {
+                **supplier_store.row(rows[i]),
+                "quantity": round(float(quantities[i]), 4),
+                "share": round(float(quantities[i] / request.demand) * 100, 2),
+                "unit_cost": float(unit_cost[i]),
+                "capacity_used": round(float(quantities[i] / capacity[i]) * 100, 2),
+            }
+            for i in used.tolist()
+        ],
+        "binding_constraints": result["binding"],
+        "constraints": result["constraints"],
+        "solve_ms": result["solve_ms"],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.get("/store")
+async def supplier_store_stats():
+    """Size and freshness of the in-memory supplier store and search index."""
+    return {**supplier_store.stats(), "search_index": supplier_search.stats()}
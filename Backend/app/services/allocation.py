@@ -0,0 +1,285 @@
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock limit handed to HiGHS; a MILP stopped early returns its best allocation so far
+ALLOCATION_TIME_LIMIT_SECONDS = float(os.getenv("ALLOCATION_TIME_LIMIT_SECONDS", "20"))
+# Relative optimality gap at which the MILP may stop
+ALLOCATION_MIP_GAP = float(os.getenv("ALLOCATION_MIP_GAP", "1e-3"))
+# A constraint counts as binding when its slack is below this fraction of its limit
+BINDING_TOLERANCE = 1e-6
+
+
+class AllocationError(Exception):
+    def __init__(self, message: str, diagnostics: Optional[List[str]] = None):
+        super().__init__(message)
+        self.message = message
+        self.diagnostics = diagnostics or []
+
+
+@dataclass
+class AllocationProblem:
+    """Split `demand` units over suppliers at minimum total cost.
+
+    Per supplier: unit cost, capacity, ESG score and risk score (0-100). Portfolio limits apply to
+    the volume-weighted averages; `max_share` is a fraction of demand. `max_suppliers` and
+    `min_order` (smallest quantity worth ordering from a supplier at all) turn the LP into a MILP.
+    """
+    demand: float
+    unit_cost: np.ndarray
+    capacity: np.ndarray
+    esg: np.ndarray
+    risk: np.ndarray
+    min_esg: Optional[float] = None
+    max_risk: Optional[float] = None
+    max_share: Optional[float] = None
+    max_suppliers: Optional[int] = None
+    min_order: Optional[float] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.unit_cost)
+
+    @property
+    def is_mixed_integer(self) -> bool:
+        return self.max_suppliers is not None or self.min_order is not None
+
+    def upper_bounds(self) -> np.ndarray:
+        upper = self.capacity.astype(float)
+        if self.max_share is not None:
+            upper = np.minimum(upper, self.max_share * self.demand)
+        if self.min_order is not None:
+            # a supplier that can't take min_order can't be used at all
+            upper = np.where(upper >= self.min_order, upper, 0.0)
+        return upper
+
+    def portfolio_rows(self):
+        """(name, coefficients, limit) of the ≤ 0 rows: Σ (min_esg - esg) x ≤ 0 and Σ (risk - max_risk) x ≤ 0."""
+        rows = []
+        if self.min_esg is not None:
+            rows.append(("min_esg", self.min_esg - self.esg, self.min_esg))
+        if self.max_risk is not None:
+            rows.append(("max_risk", self.risk - self.max_risk, self.max_risk))
+        return rows
+
+
+# ---------- SOLVE ----------
+def solve(problem: AllocationProblem) -> Dict[str, Any]:
+    """Optimal allocation with HiGHS: quantities per supplier, total cost and every constraint's slack.
+
+    Pure LPs also report shadow prices (change in total cost per unit increase of a limit).
+    Raises AllocationError when no allocation satisfies the constraints.
+    """
+    if problem.size == 0:
+        raise AllocationError("No suppliers with a unit cost and capacity to allocate to")
+    started = time.perf_counter()
+    if problem.is_mixed_integer:
+        quantities, status, duals = _solve_milp(problem)
+    else:
+        quantities, status, duals = _solve_lp(problem)
+    solve_ms = round((time.perf_counter() - started) * 1000, 3)
+    logger.info(f"Allocated {problem.demand} units over {problem.size} suppliers ({status}) in {solve_ms} ms")
+
+    quantities = np.where(quantities > BINDING_TOLERANCE * problem.demand, quantities, 0.0)
+    constraints = _constraint_report(problem, quantities, duals)
+    return {
+        "status": status,
+        "solver": "highs-milp" if problem.is_mixed_integer else "highs-lp",
+        "quantities": quantities,
+        "total_cost": float(problem.unit_cost @ quantities),
+        "constraints": constraints,
+        "binding": [c["name"] for c in constraints if c["binding"]],
+        "solve_ms": solve_ms,
+    }
+
+
+def _solve_lp(problem: AllocationProblem):
+    n = problem.size
+    rows = problem.portfolio_rows()
+    result = linprog(
+        problem.unit_cost,
+        A_ub=np.array([coefficients for _, coefficients, _ in rows]) if rows else None,
+        b_ub=np.zeros(len(rows)) if rows else None,
+        A_eq=np.ones((1, n)),
+        b_eq=[problem.demand],
+        bounds=np.column_stack([np.zeros(n), problem.upper_bounds()]),
+        method="highs",
+        options={"time_limit": ALLOCATION_TIME_LIMIT_SECONDS},
+    )
+    if result.status == 2:
+        raise AllocationError("No allocation satisfies all constraints", diagnose(problem))
+    if result.x is None:
+        raise AllocationError(f"Solver stopped without an allocation: {result.message}")
+    duals = {
+        "demand": float(result.eqlin.marginals[0]),
+        "rows": {name: float(m) for (name, _, _), m in zip(rows, result.ineqlin.marginals)} if rows else {},
+        "upper": result.upper.marginals,
+    }
+    return result.x, "optimal" if result.status == 0 else "time_limit", duals
+
+
+def _solve_milp(problem: AllocationProblem):
+    """Variables [x (quantities), y (1 if the supplier is used)] with x ≤ upper·y and x ≥ min_order·y."""
+    n = problem.size
+    upper = problem.upper_bounds()
+    identity = sparse.identity(n, format="csr")
+    x_only = lambda coefficients: sparse.hstack([sparse.csr_matrix(coefficients), sparse.csr_matrix((1, n))])
+
+    constraints = [
+        LinearConstraint(x_only(np.ones(n)), problem.demand, problem.demand),
+        LinearConstraint(sparse.hstack([identity, -sparse.diags(upper)]), -np.inf, 0),
+    ]
+    for _, coefficients, _ in problem.portfolio_rows():
+        constraints.append(LinearConstraint(x_only(coefficients), -np.inf, 0))
+    if problem.min_order is not None:
+        constraints.append(LinearConstraint(sparse.hstack([identity, -problem.min_order * identity]), 0, np.inf))
+    if problem.max_suppliers is not None:
+        constraints.append(LinearConstraint(
+            sparse.hstack([sparse.csr_matrix((1, n)), sparse.csr_matrix(np.ones((1, n)))]), 0, problem.max_suppliers
+        ))
+
+    result = milp(
+        np.concatenate([problem.unit_cost, np.zeros(n)]),
+        constraints=constraints,
+        integrality=np.concatenate([np.zeros(n), np.ones(n)]),
+        bounds=Bounds(np.zeros(2 * n), np.concatenate([upper, np.ones(n)])),
+        options={"time_limit": ALLOCATION_TIME_LIMIT_SECONDS, "mip_rel_gap": ALLOCATION_MIP_GAP},
+    )
+    if result.status == 2:
+        raise AllocationError("No allocation satisfies all constraints", diagnose(problem))
+    if result.x is None:
+        raise AllocationError(f"Solver stopped without an allocation: {result.message}")
+    return result.x[:n], "optimal" if result.status == 0 else "time_limit", None
+
+
+# ---------- REPORT ----------
+def _binding(slack: float, limit: float) -> bool:
+    return slack <= BINDING_TOLERANCE * max(1.0, abs(limit))
+
+
+def _constraint_report(problem: AllocationProblem, quantities: np.ndarray, duals: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per constraint: current value, limit, slack, whether it binds and (LP only) its shadow price."""
+    demand = problem.demand
+    upper = problem.upper_bounds()
+    upper_duals = duals["upper"] if duals else None
+    report = [{
+        "name": "demand",
+        "value": float(quantities.sum()),
+        "limit": demand,
+        "slack": 0.0,
+        "binding": True,
+        # cost of one more unit of demand
+        "shadow_price": duals["demand"] if duals else None,
+    }]
+
+    if problem.min_esg is not None:
+        average = float(problem.esg @ quantities / demand)
+        report.append({
+            "name": "min_esg",
+            "value": average,
+            "limit": problem.min_esg,
+            "slack": average - problem.min_esg,
+            "binding": _binding(average - problem.min_esg, problem.min_esg),
+            # raising the floor by one point tightens Σ (min_esg - esg) x ≤ 0 by `demand`
+            "shadow_price": -duals["rows"]["min_esg"] * demand if duals else None,
+        })
+    if problem.max_risk is not None:
+        average = float(problem.risk @ quantities / demand)
+        report.append({
+            "name": "max_risk",
+            "value": average,
+            "limit": problem.max_risk,
+            "slack": problem.max_risk - average,
+            "binding": _binding(problem.max_risk - average, problem.max_risk),
+            "shadow_price": duals["rows"]["max_risk"] * demand if duals else None,
+        })
+
+    at_upper = (quantities > 0) & (quantities >= upper - BINDING_TOLERANCE * np.maximum(1.0, upper))
+    share_limited = np.zeros(problem.size, dtype=bool)
+    if problem.max_share is not None:
+        share_limit = problem.max_share * demand
+        share_limited = at_upper & (share_limit <= problem.capacity)
+        report.append({
+            "name": "max_share",
+            # percent of demand, as in the request
+            "value": float(quantities.max() / demand * 100),
+            "limit": problem.max_share * 100,
+            "slack": float((problem.max_share - quantities.max() / demand) * 100),
+            "binding": bool(share_limited.any()),
+            "suppliers": np.flatnonzero(share_limited).tolist(),
+            # one more percentage point of share for every supplier held at the cap
+            "shadow_price": float(upper_duals[share_limited].sum() * demand / 100) if upper_duals is not None else None,
+        })
+    capacity_limited = at_upper & ~share_limited
+    report.append({
+        "name": "capacity",
+        "value": int(capacity_limited.sum()),
+        "limit": None,
+        "slack": None,
+        "binding": bool(capacity_limited.any()),
+        "suppliers": np.flatnonzero(capacity_limited).tolist(),
+        # per supplier at capacity: cost change of one more unit of that supplier's capacity
+        "shadow_price": [float(upper_duals[i]) for i in np.flatnonzero(capacity_limited)] if upper_duals is not None else None,
+    })
+
+    if problem.max_suppliers is not None:
+        used = int((quantities > 0).sum())
+        report.append({
+            "name": "max_suppliers",
+            "value": used,
+            "limit": problem.max_suppliers,
+            "slack": problem.max_suppliers - used,
+            "binding": used >= problem.max_suppliers,
+            "shadow_price": None,
+        })
+    if problem.min_order is not None:
+        used = quantities > 0
+        at_minimum = used & (quantities <= problem.min_order * (1 + BINDING_TOLERANCE))
+        report.append({
+            "name": "min_order",
+            "value": float(quantities[used].min()) if used.any() else None,
+            "limit": problem.min_order,
+            "slack": None,
+            "binding": bool(at_minimum.any()),
+            "suppliers": np.flatnonzero(at_minimum).tolist(),
+            "shadow_price": None,
+        })
+    return report
+
+
+def diagnose(problem: AllocationProblem) -> List[str]:
+    """Cheap explanations for an infeasible problem: limits that can't be met even on their own."""
+    upper = problem.upper_bounds()
+    reasons = []
+    if upper.sum() < problem.demand:
+        reasons.append(f"capacity: usable capacity {upper.sum():.2f} is below the demand of {problem.demand:.2f}")
+    if problem.min_esg is not None:
+        best = _best_average(problem.esg, upper, problem.demand, highest=True)
+        if best is not None and best < problem.min_esg:
+            reasons.append(f"min_esg: the best reachable portfolio ESG score is {best:.2f}")
+    if problem.max_risk is not None:
+        best = _best_average(problem.risk, upper, problem.demand, highest=False)
+        if best is not None and best > problem.max_risk:
+            reasons.append(f"max_risk: the lowest reachable portfolio risk is {best:.2f}")
+    if problem.max_suppliers is not None and np.sort(upper)[::-1][:problem.max_suppliers].sum() < problem.demand:
+        reasons.append(f"max_suppliers: the {problem.max_suppliers} largest suppliers can't cover the demand")
+    if not reasons:
+        reasons.append("the constraints can each be met, but not all at once")
+    return reasons
+
+
+def _best_average(values: np.ndarray, upper: np.ndarray, demand: float, highest: bool) -> Optional[float]:
+    """Volume-weighted average of `values` when demand is filled from the best suppliers first."""
+    order = np.argsort(-values if highest else values)
+    filled = np.minimum(upper[order], np.maximum(demand - np.concatenate([[0.0], np.cumsum(upper[order])[:-1]]), 0))
+    if filled.sum() <= 0:
+        return None
+    return float(values[order] @ filled / filled.sum())
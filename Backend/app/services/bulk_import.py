@@ -0,0 +1,213 @@
+import os
+import csv
+import json
+import time
+import codecs
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.database import db
+from app.schemas.auth_schemas import CompanyRegister, SupplierRegister
+from app.services.indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Per-row errors kept in the report; the counts are always complete
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Lines a quoted CSV field may span; an unterminated quote otherwise swallows the rest of the file
+IMPORT_MAX_RECORD_LINES = int(os.getenv("IMPORT_MAX_RECORD_LINES", "50"))
+
+KINDS = {"suppliers": SupplierRegister, "companies": CompanyRegister}
+FORMATS = ("csv", "ndjson")
+DUPLICATE_KEY = 11000
+
+
+# ---------- PARSING ----------
+async def text_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Lines of a UTF-8 byte stream (BOM dropped), decoded chunk by chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def csv_rows(lines: AsyncIterator[str], max_record_lines: int = IMPORT_MAX_RECORD_LINES
+                   ) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, dict) per CSV record; the first line is the header.
+
+    Quoted fields may span up to `max_record_lines` lines; a longer record (typically an
+    unterminated quote) is reported as an error and parsing resumes on the next line.
+    """
+    header: Optional[List[str]] = None
+    record: List[str] = []
+    quotes, start = 0, 0
+    number = 0
+    async for line in lines:
+        number += 1
+        if not record:
+            start = number
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            if len(record) >= max_record_lines:
+                record, quotes = [], 0
+                yield start, ValueError(f"quoted field not closed within {max_record_lines} lines")
+            continue  # inside a quoted field
+        text, record, quotes = "\n".join(record), [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        # empty cells are missing values, so optional fields fall back to their defaults
+        yield start, {name: value.strip() for name, value in zip(header, values) if value.strip()}
+    if record:
+        yield start, ValueError("unterminated quoted field")
+
+
+async def ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, ValueError(f"invalid JSON: {e.msg}")
+            continue
+        yield number, row if isinstance(row, dict) else ValueError("each line must be a JSON object")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors())
+
+
+# ---------- IMPORT ----------
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    def error(self, line: int, message: str, email_domain: Optional[str] = None):
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "email_domain": email_domain, "error": message})
+
+    def result(self) -> Dict[str, Any]:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "errors_truncated": self.invalid + self.duplicates > len(self.errors),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds) if seconds > 0 else None,
+        }
+
+
+async def import_stream(kind: str, chunks: AsyncIterator[bytes], format: str,
+                        batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Validate and insert suppliers or companies from a CSV/NDJSON byte stream.
+
+    Rows are validated with the registration schemas and inserted with unordered insert_many
+    batches; the unique email_domain index rejects rows already registered (or repeated in the
+    file), which are reported as duplicates instead of failing the batch. Memory is bounded by
+    one batch.
+    """
+    schema = KINDS[kind]
+    collection = db[kind]
+    await ensure_indexes()
+    report = ImportReport()
+    parse = csv_rows if format == "csv" else ndjson_rows
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    async for line, row in parse(text_lines(chunks)):
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.invalid += 1
+            report.error(line, str(row))
+            continue
+        try:
+            document = schema(**row).dict()
+        except ValidationError as e:
+            report.invalid += 1
+            report.error(line, _validation_message(e), row.get("email_domain"))
+            continue
+        if kind == "suppliers":
+            # lets the supplier store's last_updated poller pick the new suppliers up
+            document["last_updated"] = datetime.utcnow()
+        batch.append((line, document))
+        if len(batch) >= batch_size:
+            await _insert(collection, batch, report)
+            batch = []
+    if batch:
+        await _insert(collection, batch, report)
+
+    result = report.result()
+    logger.info(f"Imported {report.inserted}/{report.rows} {kind} ({result['rows_per_second']} rows/s)")
+    return result
+
+
+async def _insert(collection, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    try:
+        inserted = await collection.insert_many([document for _, document in batch], ordered=False)
+        report.inserted += len(inserted.inserted_ids)
+    except BulkWriteError as e:
+        details = e.details
+        report.inserted += details.get("nInserted", 0)
+        for write_error in details.get("writeErrors", []):
+            line, document = batch[write_error["index"]]
+            if write_error.get("code") == DUPLICATE_KEY:
+                report.duplicates += 1
+                report.error(line, "already registered", document.get("email_domain"))
+            else:
+                report.invalid += 1
+                report.error(line, write_error.get("errmsg", "insert failed"), document.get("email_domain"))
+
+
+# ---------- CLI ----------
+async def _file_chunks(path: str, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := await asyncio.to_thread(file.read, size):
+            yield chunk
+
+
+def _main():
+    """python -m app.services.bulk_import {suppliers,companies} FILE [--format csv|ndjson]"""
+    parser = argparse.ArgumentParser(description="Bulk-register suppliers or companies from a CSV or NDJSON file")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch", type=int, default=IMPORT_BATCH_SIZE, help="documents per insert_many")
+    args = parser.parse_args()
+
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    result = asyncio.run(import_stream(args.kind, _file_chunks(args.path), format, args.batch))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    _main()
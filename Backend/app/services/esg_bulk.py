@@ -0,0 +1,264 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from app.database import db
+from app.services.esg_scoring import (
+    SUBFACTORS, INPUT_FIELDS, WEIGHT_PROFILES, resolve_inputs, validate_weights, weight_profile_name,
+)
+from app.services.esg_imputation import peer_stats, industry_key
+from app.services.supplier_store import supplier_store
+from app.services.score_history import score_history
+from app.services.esg_extractions import extraction_store, INLINE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+ESG_BULK_WRITE_BATCH = int(os.getenv("ESG_BULK_WRITE_BATCH", "1000"))
+
+CATEGORIES = tuple(SUBFACTORS)
+SUBFACTOR_COLUMNS = [(category, subfactor) for category in CATEGORIES for subfactor in SUBFACTORS[category]]
+INPUT_COLUMN = {field: i for i, field in enumerate(INPUT_FIELDS)}
+LOWER_BOUNDS = np.array([subfactor.bounds[0] for _, subfactor in SUBFACTOR_COLUMNS], dtype=float)
+UPPER_BOUNDS = np.array([subfactor.bounds[1] for _, subfactor in SUBFACTOR_COLUMNS], dtype=float)
+CATEGORY_SLICES = {}
+for _category in CATEGORIES:
+    _start = sum(len(SUBFACTORS[c]) for c in CATEGORY_SLICES)
+    CATEGORY_SLICES[_category] = slice(_start, _start + len(SUBFACTORS[_category]))
+
+
+# ---------- VECTORIZED SCORING ----------
+def score_matrix(inputs: np.ndarray, weights: np.ndarray, estimates: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Score many suppliers at once.
+
+    `inputs` is (suppliers × INPUT_FIELDS) with NaN for missing values, `weights` is
+    (suppliers × 3) in E/S/G order. Subfactors without inputs stay NaN unless `estimates`
+    (suppliers × subfactors, peer imputations) has a value for them. Same formulas, clamping
+    and rounding as the per-supplier path in esg_scoring.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = [
+            subfactor.formula(*(inputs[:, INPUT_COLUMN[field]] for field in subfactor.inputs))
+            for _, subfactor in SUBFACTOR_COLUMNS
+        ]
+    subfactors = np.column_stack(columns).astype(float)
+    subfactors[~np.isfinite(subfactors)] = np.nan
+    subfactors = np.round(np.clip(subfactors, LOWER_BOUNDS, UPPER_BOUNDS), 2)
+    imputed = np.zeros(subfactors.shape, dtype=bool)
+    if estimates is not None:
+        imputed = np.isnan(subfactors) & ~np.isnan(estimates)
+        subfactors = np.where(imputed, estimates, subfactors)
+
+    categories = np.zeros((len(subfactors), len(CATEGORIES)))
+    for i, category in enumerate(CATEGORIES):
+        block = subfactors[:, CATEGORY_SLICES[category]]
+        counts = np.count_nonzero(~np.isnan(block), axis=1)
+        sums = np.nansum(block, axis=1)
+        categories[:, i] = np.round(np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0), 2)
+
+    final = np.round((categories * weights).sum(axis=1), 2)
+    return {"subfactors": subfactors, "imputed": imputed, "categories": categories, "final": final}
+
+
+def subfactor_document(row: List[float]) -> Dict[str, Dict[str, Optional[float]]]:
+    scores = {category: {} for category in CATEGORIES}
+    for (category, subfactor), value in zip(SUBFACTOR_COLUMNS, row):
+        scores[category][subfactor.name] = None if value != value else value  # NaN → null
+    return scores
+
+
+def imputed_document(row: List[bool]) -> Dict[str, List[str]]:
+    imputed = {}
+    for (category, subfactor), flag in zip(SUBFACTOR_COLUMNS, row):
+        if flag:
+            imputed.setdefault(category, []).append(subfactor.name)
+    return imputed
+
+
+def _weights(profile: str, override: Optional[Dict[str, float]]) -> List[float]:
+    weights = override or WEIGHT_PROFILES[profile]
+    return [float(weights[category]) for category in CATEGORIES]
+
+
+# ---------- LOAD ----------
+def industry_pattern(industry: str) -> Dict[str, Any]:
+    """Matches the industries with the same industry_key as `industry`: case and surrounding spaces ignored."""
+    return {"$regex": f"^\\s*{re.escape(industry.strip())}\\s*$", "$options": "i"}
+
+
+def _number(value: Any) -> Optional[float]:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+async def _load(query: Dict[str, Any]):
+    """Suppliers as (ids, industries, input rows, freshly resolved inputs)."""
+    ids, industries, rows, resolved = [], [], [], {}
+
+    def add(supplier, inputs):
+        ids.append(supplier["_id"])
+        industries.append(supplier.get("industry"))
+        rows.append([_number(inputs.get(field)) for field in INPUT_FIELDS])
+
+    # Scored before: the resolved inputs are stored on the supplier
+    cursor = db.suppliers.find(
+        {**query, "esg_inputs": {"$exists": True}},
+        {"industry": 1, "esg_inputs": 1},
+    )
+    async for supplier in cursor:
+        add(supplier, supplier["esg_inputs"] or {})
+
+    # Never scored: parse the extraction once and keep the inputs for next time
+    cursor = db.suppliers.find(
+        {**query, "esg_inputs": {"$exists": False},
+         "$or": [{"esg_extraction_id": {"$exists": True}}, {"esg_upload_result": {"$exists": True}}]},
+        {"industry": 1, "esg_extraction_id": 1, **{field: 1 for field in INLINE_FIELDS}},
+    )
+    async for supplier in cursor:
+        extraction = await extraction_store.load(supplier)
+        if extraction is None:
+            continue
+        inputs = resolve_inputs(extraction["result"], extraction["overall_data"])
+        resolved[supplier["_id"]] = inputs
+        add(supplier, inputs)
+
+    return ids, industries, rows, resolved
+
+
+async def _peer_estimates(industries: List[Optional[str]]) -> List[List[Optional[float]]]:
+    """Imputation value of every subfactor for every supplier, computed once per industry."""
+    stats = await peer_stats.load(industries)
+    by_industry = {}
+    rows = []
+    for industry in industries:
+        key = industry_key(industry)
+        if key not in by_industry:
+            estimates = peer_stats.estimates(stats, industry)
+            by_industry[key] = [estimates[(category, subfactor.name)] for category, subfactor in SUBFACTOR_COLUMNS]
+        rows.append(by_industry[key])
+    return rows
+
+
+def _as_matrix(rows: List[List[Optional[float]]], width: int) -> np.ndarray:
+    # None → NaN
+    return np.array(rows, dtype=float).reshape(len(rows), width)
+
+
+# ---------- RESCORE ----------
+async def rescore_all(profile: Optional[str] = None, weights: Optional[Dict[str, float]] = None,
+                      industry: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """Recompute subfactor, category and final ESG scores of every scored supplier.
+
+    Each supplier uses its industry's weight profile unless `profile` or explicit `weights` is given.
+    `industry` matches the way profiles and peer statistics do, ignoring case and surrounding spaces.
+    """
+    if profile is not None and profile not in WEIGHT_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown weight profile: {profile}")
+    if weights is not None:
+        try:
+            weights = validate_weights(weights)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    started = time.perf_counter()
+    query = {"industry": industry_pattern(industry)} if industry else {}
+    ids, industries, rows, resolved = await _load(query)
+    loaded = time.perf_counter()
+
+    profiles = [profile or weight_profile_name(name) for name in industries]
+    weight_rows = np.array([_weights(name, weights) for name in profiles], dtype=float).reshape(len(ids), len(CATEGORIES))
+    estimate_rows = await _peer_estimates(industries)
+    scores = score_matrix(
+        _as_matrix(rows, len(INPUT_FIELDS)),
+        weight_rows,
+        _as_matrix(estimate_rows, len(SUBFACTOR_COLUMNS)),
+    )
+    scored = time.perf_counter()
+
+    updated = 0
+    if not dry_run and ids:
+        now = datetime.utcnow()
+        subfactor_rows = scores["subfactors"].tolist()
+        imputed_rows = scores["imputed"].tolist()
+        category_rows = scores["categories"].tolist()
+        finals = scores["final"].tolist()
+        requests, points = [], []
+        for i, supplier_id in enumerate(ids):
+            E_score, S_score, G_score = category_rows[i]
+            fields = {
+                "esg_subfactor_scores": subfactor_document(subfactor_rows[i]),
+                "esg_imputed_subfactors": imputed_document(imputed_rows[i]),
+                "esg_E_score": E_score,
+                "esg_S_score": S_score,
+                "esg_G_score": G_score,
+                "esg_final_score": finals[i],
+                "esg_weight_profile": "custom" if weights else profiles[i],
+                "last_updated": now,
+            }
+            if supplier_id in resolved:
+                fields["esg_inputs"] = resolved[supplier_id]
+            requests.append(UpdateOne({"_id": supplier_id}, {"$set": fields}))
+            points.append(score_history.point(supplier_id, industries[i], fields, now, source="rescore"))
+
+        for offset in range(0, len(requests), ESG_BULK_WRITE_BATCH):
+            result = await db.suppliers.bulk_write(requests[offset:offset + ESG_BULK_WRITE_BATCH], ordered=False)
+            updated += result.modified_count
+            await score_history.record_many(points[offset:offset + ESG_BULK_WRITE_BATCH])
+        # observed scores changed wholesale: recount rather than apply thousands of deltas
+        await peer_stats.rebuild()
+        await supplier_store.reload()
+    finished = time.perf_counter()
+
+    score_seconds = scored - loaded
+    stats = {
+        "suppliers": len(ids),
+        "updated": updated,
+        "dry_run": dry_run,
+        "imputed_values": int(scores["imputed"].sum()),
+        "profiles": dict(Counter("custom" if weights else name for name in profiles)),
+        "load_seconds": round(loaded - started, 4),
+        "score_seconds": round(score_seconds, 4),
+        "write_seconds": round(finished - scored, 4),
+        "scored_per_second": round(len(ids) / score_seconds) if score_seconds > 0 else None,
+    }
+    logger.info(f"Bulk ESG rescore: {stats}")
+    return stats
+
+
+# ---------- CLI ----------
+def _benchmark(n: int):
+    rng = np.random.default_rng(0)
+    inputs = rng.uniform(0, 100, size=(n, len(INPUT_FIELDS)))
+    inputs[rng.random(inputs.shape) < 0.1] = np.nan
+    weights = np.tile(_weights("default", None), (n, 1))
+    started = time.perf_counter()
+    score_matrix(inputs, weights)
+    seconds = time.perf_counter() - started
+    print(f"{n} synthetic suppliers scored in {seconds * 1000:.1f} ms ({n / seconds:,.0f}/s)")
+
+
+def _main():
+    """python -m app.services.esg_bulk [--profile NAME] [--industry NAME] [--dry-run] [--benchmark N]"""
+    parser = argparse.ArgumentParser(description="Rescore the ESG scores of all suppliers")
+    parser.add_argument("--profile", choices=sorted(WEIGHT_PROFILES), help="weight profile for every supplier")
+    parser.add_argument("--industry", help="only rescore suppliers of this industry")
+    parser.add_argument("--dry-run", action="store_true", help="compute but don't write")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="score N synthetic suppliers, no database")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark(args.benchmark)
+        return
+    print(asyncio.run(rescore_all(profile=args.profile, industry=args.industry, dry_run=args.dry_run)))
+
+
+if __name__ == "__main__":
+    _main()
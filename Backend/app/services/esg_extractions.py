@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import bson
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+ESG_EXTRACTION_MIGRATE_BATCH = int(os.getenv("ESG_EXTRACTION_MIGRATE_BATCH", "200"))
+
+# Where older code kept the raw extraction: inline on the supplier document
+INLINE_FIELDS = ("esg_upload_result", "esg_overall_data")
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """What the supplier document keeps of an extraction: counts and size, no values."""
+    values = result.get("result") if isinstance(result.get("result"), dict) else {}
+    overall_data = result.get("overall_data") if isinstance(result.get("overall_data"), dict) else {}
+    return {
+        "status": result.get("status"),
+        "fields_found": sum(1 for value in values.values() if value not in (None, "", "null")),
+        "fields_total": len(values),
+        "overall_data_fields": len(overall_data),
+        "size_bytes": len(bson.encode({"result": values, "overall_data": overall_data})),
+        "extracted_at": datetime.utcnow(),
+    }
+
+
+class ExtractionStore:
+    """Raw extraction payloads (`result` and the unbounded `overall_data`), one document per upload.
+
+    The supplier document only references the latest one (`esg_extraction_id`) and keeps a
+    compact `esg_extraction_summary`, so the lookups by email_domain that every route does stay
+    small. The payload is read only where it is needed: the prefill endpoint and scoring.
+    Suppliers written before the split may still carry the payload inline; `load` reads both.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("supplier_id", ASCENDING)])
+
+    async def save(self, supplier: Dict[str, Any], result: Dict[str, Any], filename: Optional[str] = None) -> ObjectId:
+        """Store a new extraction for `supplier`, point the supplier at it and drop the one it replaces.
+
+        The replaced extraction is the one the supplier referenced right before this write, so
+        concurrent uploads each drop only their predecessor, never the one that ends up current.
+        """
+        inserted = await self.collection.insert_one({
+            "supplier_id": supplier["_id"],
+            "email_domain": supplier.get("email_domain"),
+            "result": result.get("result"),
+            "overall_data": result.get("overall_data"),
+            "status": result.get("status"),
+            "filename": filename,
+            "created_at": datetime.utcnow(),
+        })
+        previous = await db.suppliers.find_one_and_update(
+            {"_id": supplier["_id"]},
+            {
+                "$set": {
+                    "esg_extraction_id": inserted.inserted_id,
+                    "esg_extraction_summary": summarize(result),
+                    "esg_upload_status": result.get("status"),
+                    "last_updated": datetime.utcnow(),
+                },
+                "$unset": {field: "" for field in INLINE_FIELDS},
+            },
+            projection={"esg_extraction_id": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        previous_id = (previous or {}).get("esg_extraction_id")
+        if previous_id is not None and previous_id != inserted.inserted_id:
+            await self.collection.delete_one({"_id": previous_id})
+        return inserted.inserted_id
+
+    async def load(self, supplier: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """{"result", "overall_data"} of the supplier's latest extraction, or None if it has none.
+
+        `supplier` needs `esg_extraction_id`, or the inline fields for suppliers not migrated yet.
+        """
+        if "esg_upload_result" in supplier:
+            return {"result": supplier["esg_upload_result"], "overall_data": supplier.get("esg_overall_data") or {}}
+        extraction_id = supplier.get("esg_extraction_id")
+        if extraction_id is None:
+            return None
+        extraction = await self.collection.find_one({"_id": extraction_id}, {"result": 1, "overall_data": 1})
+        if not extraction:
+            logger.warning(f"Extraction {extraction_id} of supplier {supplier.get('_id')} is missing")
+            return None
+        return {"result": extraction.get("result"), "overall_data": extraction.get("overall_data") or {}}
+
+    # ---------- MIGRATION ----------
+    async def migrate(self, batch: int = ESG_EXTRACTION_MIGRATE_BATCH) -> Dict[str, int]:
+        """Move inline payloads of older supplier documents into this collection. Safe to rerun."""
+        moved = 0
+        while True:
+            suppliers = await db.suppliers.find(
+                {"esg_upload_result": {"$exists": True}},
+                {"email_domain": 1, "esg_upload_status": 1, **{field: 1 for field in INLINE_FIELDS}},
+            ).limit(batch).to_list(length=batch)
+            if not suppliers:
+                break
+            for supplier in suppliers:
+                await self.save(supplier, {
+                    "result": supplier.get("esg_upload_result"),
+                    "overall_data": supplier.get("esg_overall_data"),
+                    "status": supplier.get("esg_upload_status"),
+                })
+            moved += len(suppliers)
+            logger.info(f"Moved {moved} inline extractions so far")
+        return {"moved": moved}
+
+
+extraction_store = ExtractionStore(db.esg_extractions)
+
+
+# ---------- MEASUREMENT ----------
+async def measure(samples: int = 200) -> Dict[str, Any]:
+    """Supplier document size and the latency of the lookup the routes do (find_one by email_domain)."""
+    domains = [
+        supplier["email_domain"]
+        for supplier in await db.suppliers.find({"email_domain": {"$exists": True}}, {"email_domain": 1}).to_list(length=samples)
+    ]
+    sizes, latencies = [], []
+    for domain in domains:
+        started = time.perf_counter()
+        supplier = await db.suppliers.find_one({"email_domain": domain})
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(bson.encode(supplier)))
+    if not domains:
+        return {"suppliers": 0}
+    latencies.sort()
+    return {
+        "suppliers": len(domains),
+        "inline_payloads": await db.suppliers.count_documents({"esg_upload_result": {"$exists": True}}),
+        "doc_bytes_mean": round(sum(sizes) / len(sizes)),
+        "doc_bytes_max": max(sizes),
+        "find_one_ms_p50": round(latencies[len(latencies) // 2], 3),
+        "find_one_ms_p99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+    }
+
+
+def _main():
+    """python -m app.services.esg_extractions {measure,migrate} [--samples N]"""
+    parser = argparse.ArgumentParser(description="Move raw ESG extractions out of the supplier documents")
+    parser.add_argument("command", choices=["measure", "migrate"],
+                        help="measure: supplier document size and lookup latency; migrate: measure, move, measure")
+    parser.add_argument("--samples", type=int, default=200, help="suppliers to measure")
+    args = parser.parse_args()
+
+    async def run():
+        if args.command == "measure":
+            print(await measure(args.samples))
+            return
+        print("before:", await measure(args.samples))
+        print(await extraction_store.migrate())
+        print("after: ", await measure(args.samples))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    _main()
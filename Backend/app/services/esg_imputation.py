@@ -0,0 +1,195 @@
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.database import db
+from app.services.esg_scoring import SUBFACTORS
+
+logger = logging.getLogger(__name__)
+
+# "median" (from a 1-point histogram) or "mean" of the peers' observed scores
+ESG_IMPUTATION_METHOD = os.getenv("ESG_IMPUTATION_METHOD", "median")
+# Below this many observed peer values in the supplier's industry, all suppliers are used instead
+ESG_IMPUTATION_MIN_PEERS = int(os.getenv("ESG_IMPUTATION_MIN_PEERS", "3"))
+
+ALL_INDUSTRIES = "_all"
+
+SubfactorKey = Tuple[str, str]  # (category, subfactor name)
+
+
+def industry_key(industry: Optional[str]) -> str:
+    return (industry or "").strip().lower() or "unknown"
+
+
+def observed_scores(scores: Any, imputed: Any = None) -> Dict[SubfactorKey, float]:
+    """Subfactor scores that came from the supplier's own data, i.e. not null and not imputed."""
+    if not isinstance(scores, dict):
+        return {}
+    imputed = imputed if isinstance(imputed, dict) else {}
+    observed = {}
+    for category, subfactors in SUBFACTORS.items():
+        values = scores.get(category) or {}
+        skip = set(imputed.get(category) or ())
+        for subfactor in subfactors:
+            value = values.get(subfactor.name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and subfactor.name not in skip:
+                observed[(category, subfactor.name)] = float(value)
+    return observed
+
+
+def _stat_fields(category: str, name: str) -> str:
+    return f"subfactors.{category}.{name}"
+
+
+def _nested(flat: Dict[str, float]) -> Dict[str, Any]:
+    """{"a.b.c": 1} → {"a": {"b": {"c": 1}}}: the document $inc with those paths would build."""
+    document: Dict[str, Any] = {}
+    for path, value in flat.items():
+        *parents, leaf = path.split(".")
+        node = document
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return document
+
+
+class PeerStats:
+    """Per-industry statistics of observed subfactor scores, used to fill the gaps of new suppliers.
+
+    One document per industry (plus one across all industries) holds count, sum and a histogram
+    with 1-point bins for every subfactor. Scoring a supplier applies the difference between its
+    old and new observed scores with $inc, so the statistics never need a rescan; estimating a
+    missing value reads at most ~200 bins.
+    """
+
+    def __init__(self, collection, method: str = ESG_IMPUTATION_METHOD, min_peers: int = ESG_IMPUTATION_MIN_PEERS):
+        self.collection = collection
+        self.method = method
+        self.min_peers = min_peers
+
+    # ---------- UPDATE ----------
+    async def record(self, industry: Optional[str], old: Dict[SubfactorKey, float], new: Dict[SubfactorKey, float]):
+        """Replace a supplier's `old` observed scores with `new` in its industry's statistics."""
+        inc = defaultdict(int)
+        for (category, name), value in old.items():
+            self._add(inc, category, name, value, -1)
+        for (category, name), value in new.items():
+            self._add(inc, category, name, value, 1)
+        inc = {field: delta for field, delta in inc.items() if delta}
+        if not inc:
+            return
+        now = datetime.utcnow()
+        for key in (industry_key(industry), ALL_INDUSTRIES):
+            await self.collection.update_one({"_id": key}, {"$inc": inc, "$set": {"updated_at": now}}, upsert=True)
+
+    @staticmethod
+    def _add(inc: Dict[str, float], category: str, name: str, value: float, sign: int):
+        prefix = _stat_fields(category, name)
+        inc[f"{prefix}.count"] += sign
+        inc[f"{prefix}.sum"] += sign * value
+        inc[f"{prefix}.hist.{int(round(value))}"] += sign
+
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recompute all statistics from the scores stored on the suppliers.
+
+        Each group's document is replaced in place and groups that no longer exist are removed
+        afterwards, so scoring keeps finding statistics while the rebuild runs.
+        """
+        inc_by_industry = defaultdict(lambda: defaultdict(int))
+        suppliers = 0
+        cursor = db.suppliers.find(
+            {"esg_subfactor_scores": {"$exists": True}},
+            {"industry": 1, "esg_subfactor_scores": 1, "esg_imputed_subfactors": 1},
+        )
+        async for supplier in cursor:
+            suppliers += 1
+            observed = observed_scores(supplier.get("esg_subfactor_scores"), supplier.get("esg_imputed_subfactors"))
+            for key in (industry_key(supplier.get("industry")), ALL_INDUSTRIES):
+                for (category, name), value in observed.items():
+                    self._add(inc_by_industry[key], category, name, value, 1)
+
+        now = datetime.utcnow()
+        for key, inc in inc_by_industry.items():
+            await self.collection.replace_one({"_id": key}, {**_nested(inc), "updated_at": now}, upsert=True)
+        await self.collection.delete_many({"_id": {"$nin": list(inc_by_industry)}})
+        logger.info(f"Rebuilt ESG peer statistics from {suppliers} suppliers ({len(inc_by_industry)} groups)")
+        return {"suppliers": suppliers, "groups": len(inc_by_industry)}
+
+    async def ensure_ready(self):
+        if await self.collection.estimated_document_count() == 0:
+            await self.rebuild()
+
+    # ---------- ESTIMATE ----------
+    async def load(self, industries: Iterable[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+        keys = list({industry_key(industry) for industry in industries} | {ALL_INDUSTRIES})
+        docs = await self.collection.find({"_id": {"$in": keys}}).to_list(length=None)
+        return {doc["_id"]: doc for doc in docs}
+
+    def estimate(self, stats: Dict[str, Dict[str, Any]], industry: Optional[str], category: str, name: str) -> Optional[float]:
+        for key in (industry_key(industry), ALL_INDUSTRIES):
+            entry = ((stats.get(key) or {}).get("subfactors") or {}).get(category, {}).get(name)
+            if not entry or entry.get("count", 0) < (self.min_peers if key != ALL_INDUSTRIES else 1):
+                continue
+            if self.method == "mean":
+                return round(entry["sum"] / entry["count"], 2)
+            return self._median(entry)
+        return None
+
+    @staticmethod
+    def _median(entry: Dict[str, Any]) -> float:
+        bins = sorted((int(value), count) for value, count in entry.get("hist", {}).items() if count > 0)
+        half = sum(count for _, count in bins) / 2
+        seen = 0
+        for value, count in bins:
+            seen += count
+            if seen >= half:
+                return float(value)
+        return round(entry["sum"] / entry["count"], 2)
+
+    def estimates(self, stats: Dict[str, Dict[str, Any]], industry: Optional[str]) -> Dict[SubfactorKey, Optional[float]]:
+        return {
+            (category, subfactor.name): self.estimate(stats, industry, category, subfactor.name)
+            for category, subfactors in SUBFACTORS.items()
+            for subfactor in subfactors
+        }
+
+    async def impute(self, industry: Optional[str], scores: Dict[str, Dict[str, Optional[float]]]):
+        """Fill null subfactors from peer statistics. Returns (filled scores, imputed names per category)."""
+        stats = await self.load([industry])
+        filled = {category: dict(values) for category, values in scores.items()}
+        imputed: Dict[str, List[str]] = {}
+        for category, values in filled.items():
+            for name, value in values.items():
+                if value is not None:
+                    continue
+                estimate = self.estimate(stats, industry, category, name)
+                if estimate is not None:
+                    values[name] = estimate
+                    imputed.setdefault(category, []).append(name)
+        return filled, imputed
+
+    async def summary(self, industry: Optional[str] = None) -> Dict[str, Any]:
+        stats = await self.load([industry] if industry else [])
+        key = industry_key(industry) if industry else ALL_INDUSTRIES
+        doc = stats.get(key) or {}
+        return {
+            "industry": key,
+            "method": self.method,
+            "min_peers": self.min_peers,
+            "updated_at": doc.get("updated_at"),
+            "subfactors": {
+                category: {
+                    subfactor.name: {
+                        "count": int(((doc.get("subfactors") or {}).get(category, {}).get(subfactor.name) or {}).get("count", 0)),
+                        "estimate": self.estimate(stats, industry, category, subfactor.name),
+                    }
+                    for subfactor in subfactors
+                }
+                for category, subfactors in SUBFACTORS.items()
+            },
+        }
+
+
+peer_stats = PeerStats(db.esg_peer_stats)
@@ -0,0 +1,164 @@
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from app.database import db
+from app.services.gemini_service import gemini_service, EXTRACTION_VERSION
+from app.services.extraction_cache import extraction_cache
+from app.services.esg_extractions import extraction_store, INLINE_FIELDS
+from app.services.esg_scoring import resolve_inputs, score_inputs, final_score, weight_profile_name, WEIGHT_PROFILES
+from app.services.esg_imputation import peer_stats, observed_scores
+from app.services.supplier_store import supplier_store
+from app.services.score_history import score_history
+from app.services.tenants import tenants
+
+logger = logging.getLogger(__name__)
+
+
+def calculate_category_score(scores):
+    valid_scores = [v for v in scores.values() if isinstance(v, (int, float))]
+    return round(sum(valid_scores) / len(valid_scores), 2) if valid_scores else 0
+
+
+# ---------- 1. EXTRACT ----------
+async def extract_report(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """Extract ESG data from an uploaded report, reusing a cached extraction when possible."""
+    cache_key = await extraction_cache.make_key(file_content, EXTRACTION_VERSION)
+    cached = await extraction_cache.get(cache_key)
+
+    if cached:
+        logger.info(f"Extraction cache hit for {filename}")
+        return {**cached, "status": "success", "cached": True}
+
+    gemini = gemini_service(api_key=os.getenv("GEMINI_API_KEY"))
+    result = await gemini.extract_esg_data(file_content, filename)
+    if result.get("status") == "success" and isinstance(result.get("result"), dict):
+        await extraction_cache.put(cache_key, result, filename)
+    return result
+
+
+# ---------- 2. PERSIST ----------
+async def store_extraction(email_domain: str, result: Dict[str, Any], filename: Optional[str] = None):
+    """Attach an extraction result to the supplier owning `email_domain` (stored in esg_extractions)."""
+    supplier = await tenants.supplier(email_domain)
+
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+
+    await extraction_store.save(supplier, result, filename)
+    tenants.invalidate("suppliers", email_domain)
+
+
+# ---------- 3. SCORE ----------
+SCORING_PROJECTION = {
+    "industry": 1, "esg_extraction_id": 1,
+    **{field: 1 for field in INLINE_FIELDS},
+}
+# What peer statistics need of the scores a write replaces
+PREVIOUS_SCORES_PROJECTION = {"industry": 1, "esg_subfactor_scores": 1, "esg_imputed_subfactors": 1}
+
+
+async def score_supplier(email_domain: str) -> Dict[str, Any]:
+    """Calculate subfactor, category and final ESG scores for a supplier and store them."""
+    # 1. Supplier Validation
+    supplier = await db.suppliers.find_one({"email_domain": email_domain}, SCORING_PROJECTION)
+    if not supplier:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+
+    extraction = await extraction_store.load(supplier)
+    if extraction is None:
+        raise HTTPException(
+            status_code=400, 
+            detail="ESG data not found. Please upload a report first."
+        )
+
+    # 2. Compute subfactor scores locally from the extracted values
+    inputs = resolve_inputs(extraction["result"], extraction["overall_data"])
+    subfactor_scores = score_inputs(inputs)
+
+    # 3. Fill the subfactors the report had no data for from industry peers
+    fixed_scores, imputed = await peer_stats.impute(supplier.get("industry"), subfactor_scores)
+
+    # 4. Calculate Final Scores
+    E_score = calculate_category_score(fixed_scores["Environmental"])
+    S_score = calculate_category_score(fixed_scores["Social"])
+    G_score = calculate_category_score(fixed_scores["Governance"])
+    profile = weight_profile_name(supplier.get("industry"))
+    ESG_score = final_score(
+        {"Environmental": E_score, "Social": S_score, "Governance": G_score},
+        WEIGHT_PROFILES[profile],
+    )
+
+    # 5. Update Database, reading the scores this write replaces in the same operation: a
+    # concurrent scoring of the same supplier must not subtract the same old scores again
+    previous = await db.suppliers.find_one_and_update(
+        {"email_domain": email_domain},
+        {"$set": {
+            "esg_subfactor_scores": fixed_scores,
+            "esg_imputed_subfactors": imputed,
+            "esg_E_score": E_score,
+            "esg_S_score": S_score,
+            "esg_G_score": G_score,
+            "esg_final_score": ESG_score,
+            "esg_weight_profile": profile,
+            # resolved formula inputs, so bulk rescoring doesn't have to re-parse the extraction
+            "esg_inputs": inputs,
+            "last_updated": datetime.utcnow()
+        }},
+        projection=PREVIOUS_SCORES_PROJECTION,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    tenants.invalidate("suppliers", email_domain)
+    await peer_stats.record(
+        previous.get("industry"),
+        observed_scores(previous.get("esg_subfactor_scores"), previous.get("esg_imputed_subfactors")),
+        observed_scores(subfactor_scores),
+    )
+    await score_history.record(
+        supplier["_id"],
+        supplier.get("industry"),
+        {"esg_E_score": E_score, "esg_S_score": S_score, "esg_G_score": G_score, "esg_final_score": ESG_score},
+        source="score",
+    )
+    await supplier_store.refresh(email_domain)
+
+    return {
+        "final_subfactor_scores": fixed_scores,
+        "imputed_subfactors": imputed,
+        "E_score": E_score,
+        "S_score": S_score,
+        "G_score": G_score,
+        "ESG_score": ESG_score
+    }
+
+
+# ---------- BACKGROUND JOBS ----------
+async def run_report_job(job: Dict[str, Any], ctx) -> Dict[str, Any]:
+    """extract → persist → score for an uploaded report."""
+    payload = job["payload"]
+    async with ctx.stage("extract"):
+        file_content = await ctx.read_upload()
+        extraction = await extract_report(file_content, payload["filename"])
+
+    async with ctx.stage("persist"):
+        await store_extraction(payload["email_domain"], extraction, payload["filename"])
+
+    if extraction.get("status") != "success":
+        raise RuntimeError(f"Extraction failed: {extraction.get('error')}")
+
+    scores = None
+    if payload.get("score"):
+        async with ctx.stage("score"):
+            scores = await score_supplier(payload["email_domain"])
+    return {"extraction": extraction, "scores": scores}
+
+
+async def run_score_job(job: Dict[str, Any], ctx) -> Dict[str, Any]:
+    async with ctx.stage("score"):
+        return await score_supplier(job["payload"]["email_domain"])
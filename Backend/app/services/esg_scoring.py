@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.unit_converter import convert_to_standard_unit
+
+# ---------- FORMULAS ----------
+# The automotive benchmarks (2.85 tCO2e/vehicle, 3150 MWh per 1000 vehicles, ...) are the ones
+# the scoring prompt used to hand to Gemini.
+
+@dataclass(frozen=True)
+class Subfactor:
+    name: str
+    inputs: Tuple[str, ...]
+    formula: Callable[..., float]
+    bounds: Tuple[float, float] = (0, 100)
+
+
+SUBFACTORS: Dict[str, List[Subfactor]] = {
+    "Environmental": [
+        Subfactor("GHG Score", ("company_ghg_emissions_per_unit_revenue",),
+                  lambda ghg: 100 * (1 - ghg / 2.85)),
+        Subfactor("Energy Efficiency Score", ("company_energy_consumption_per_unit_output",),
+                  lambda energy: 100 * (1 - energy / 3150)),
+        Subfactor("Water Efficiency Score", ("company_water_withdrawal_per_unit_output",),
+                  lambda water: 100 * (1 - water / 3.85)),
+        Subfactor("Waste Recycling Score", ("amount_waste_recycled", "total_waste_generated"),
+                  lambda recycled, total: 100 * (recycled / total)),
+        Subfactor("Compliance Score", ("environmental_fines_penalty_weight",),
+                  lambda fines: 100 - fines * 7.5),
+        Subfactor("Renewable Energy Score", ("renewable_energy_consumption", "total_energy_consumption"),
+                  lambda renewable, total: 100 * (renewable / total)),
+        Subfactor("Biodiversity Score", ("biodiversity_impact_score",),
+                  lambda impact: 100 - impact / 40 * 100),
+        Subfactor("Climate Risk Management Score", ("climate_risk_mitigation_measures_implemented",),
+                  lambda measures: 100 * (measures / 18)),
+    ],
+    "Social": [
+        Subfactor("Retention Score", ("employee_turnover_rate",),
+                  lambda turnover: 100 * (1 - turnover / 15)),
+        Subfactor("Safety Score", ("company_injury_rate",),
+                  lambda injury: 100 * (1 - injury / 3.85)),
+        Subfactor("Diversity Score", ("number_diverse_employees", "total_employees"),
+                  lambda diverse, total: 100 * (diverse / total)),
+        Subfactor("Community Investment Score", ("amount_invested_community_programs", "total_revenue"),
+                  lambda invested, revenue: 100 * (invested / revenue)),
+        Subfactor("Customer Satisfaction Score", ("net_promoter_score",),
+                  lambda nps: nps, bounds=(-100, 100)),
+        Subfactor("Human Rights Score", ("number_reported_violations_severity_weight",),
+                  lambda violations: 100 - violations * 15),
+        Subfactor("Training Score", ("avg_training_hours_per_employee",),
+                  lambda hours: 100 * (hours / 40)),
+    ],
+    "Governance": [
+        Subfactor("Board Independence Score", ("number_independent_directors", "total_number_directors"),
+                  lambda independent, total: 100 * (independent / total)),
+        Subfactor("Compensation Alignment Score", ("ceo_pay_ratio",),
+                  lambda ratio: 100 - abs((ratio - 200) / 200 * 100)),
+        Subfactor("Audit Committee Score", ("number_independent_audit_committee_members", "total_audit_committee_members"),
+                  lambda independent, total: 100 * (independent / total)),
+        Subfactor("Shareholder Rights Score", ("number_shareholder_friendly_policies_implemented",),
+                  lambda policies: 100 * (policies / 14)),
+        Subfactor("Transparency Score", ("number_disclosed_esg_metrics",),
+                  lambda disclosed: 100 * (disclosed / 50)),
+        Subfactor("Anti-Corruption Score", ("number_corruption_incidents_severity_weight",),
+                  lambda incidents: 100 - incidents * 20),
+        Subfactor("Tax Transparency Score", ("number_disclosed_tax_jurisdictions", "total_number_operating_jurisdictions"),
+                  lambda disclosed, total: 100 * (disclosed / total)),
+    ],
+}
+
+INPUT_FIELDS = tuple(sorted({field for subfactors in SUBFACTORS.values() for sub in subfactors for field in sub.inputs}))
+
+# ---------- CATEGORY WEIGHTS ----------
+# Named E/S/G weight profiles; a supplier uses the profile named after its (lower-cased) industry,
+# else "default". Extra or changed profiles can be given as JSON in ESG_WEIGHT_PROFILES.
+WEIGHT_PROFILES: Dict[str, Dict[str, float]] = {
+    "default": {"Environmental": 0.4, "Social": 0.35, "Governance": 0.25},
+    "automotive": {"Environmental": 0.4, "Social": 0.35, "Governance": 0.25},
+    "manufacturing": {"Environmental": 0.45, "Social": 0.3, "Governance": 0.25},
+    "logistics": {"Environmental": 0.45, "Social": 0.3, "Governance": 0.25},
+    "technology": {"Environmental": 0.3, "Social": 0.35, "Governance": 0.35},
+    "finance": {"Environmental": 0.2, "Social": 0.35, "Governance": 0.45},
+}
+# How far the weights of a profile may sum from 1
+WEIGHT_SUM_TOLERANCE = 1e-6
+
+
+def validate_weights(weights: Any) -> Dict[str, float]:
+    """E/S/G weights as floats; ValueError unless they are non-negative and sum to 1."""
+    if not isinstance(weights, dict) or set(weights) != set(SUBFACTORS):
+        raise ValueError(f"weights must have exactly the keys {list(SUBFACTORS)}")
+    values = {}
+    for category in SUBFACTORS:
+        value = weights[category]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not value >= 0:
+            raise ValueError(f"weight of {category} must be a non-negative number, got {value!r}")
+        values[category] = float(value)
+    if abs(sum(values.values()) - 1) > WEIGHT_SUM_TOLERANCE:
+        raise ValueError(f"weights must sum to 1, got {sum(values.values()):g}")
+    return values
+
+
+def _load_weight_profiles(raw: str) -> Dict[str, Dict[str, float]]:
+    """Profiles given as JSON in ESG_WEIGHT_PROFILES, lower-cased like the industries they match."""
+    profiles = json.loads(raw)
+    if not isinstance(profiles, dict):
+        raise ValueError("ESG_WEIGHT_PROFILES must be a JSON object of profiles")
+    validated = {}
+    for name, weights in profiles.items():
+        try:
+            validated[name.strip().lower()] = validate_weights(weights)
+        except ValueError as e:
+            raise ValueError(f"ESG_WEIGHT_PROFILES profile {name!r}: {e}") from None
+    return validated
+
+
+WEIGHT_PROFILES.update(_load_weight_profiles(os.getenv("ESG_WEIGHT_PROFILES", "{}")))
+
+
+def weight_profile_name(industry: Optional[str]) -> str:
+    name = (industry or "").strip().lower()
+    return name if name in WEIGHT_PROFILES else "default"
+
+
+def final_score(category_scores: Dict[str, float], weights: Dict[str, float]) -> float:
+    return round(sum(weights[category] * category_scores[category] for category in SUBFACTORS), 2)
+
+
+# ---------- overall_data FALLBACKS ----------
+# (terms that must all appear in the overall_data key, preferred nested keys if the value is a dict)
+# The keys follow the checklist of the extraction prompt.
+OVERALL_DATA_KEYS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "amount_waste_recycled": (("recycled", "waste"), ("total", "recycled")),
+    "total_waste_generated": (("total", "waste", "generated"), ("total",)),
+    "environmental_fines_penalty_weight": (("environmental", "fines"), ("number", "count", "total")),
+    "renewable_energy_consumption": (("renewable",), ("renewable",)),
+    "total_energy_consumption": (("total", "energy", "consumption"), ("total",)),
+    "biodiversity_impact_score": (("ecosystem",), ("score", "rating", "total")),
+    "climate_risk_mitigation_measures_implemented": (("climate", "measures"), ("implemented",)),
+    "employee_turnover_rate": (("turnover",), ("total", "rate")),
+    "company_injury_rate": (("injury",), ("total accident", "total injury", "injury rate", "total")),
+    "number_diverse_employees": (("diverse",), ("total",)),
+    "total_employees": (("total", "employees"), ("total",)),
+    "amount_invested_community_programs": (("community",), ("total",)),
+    "total_revenue": (("revenue",), ("total",)),
+    "net_promoter_score": (("customer", "satisfaction"), ("nps", "net promoter")),
+    "avg_training_hours_per_employee": (("training", "hours"), ("per employee", "average")),
+    "number_independent_directors": (("independent", "directors"), ("independent",)),
+    "total_number_directors": (("independent", "directors"), ("total",)),
+    "ceo_pay_ratio": (("ceo", "pay"), ("ratio",)),
+    "number_independent_audit_committee_members": (("audit", "committee"), ("independent",)),
+    "total_audit_committee_members": (("audit", "committee"), ("total",)),
+    "number_shareholder_friendly_policies_implemented": (("shareholder",), ("implemented", "count", "total")),
+    "number_disclosed_esg_metrics": (("disclosed", "esg", "metrics"), ("disclosed", "total")),
+    "number_corruption_incidents_severity_weight": (("corruption",), ("severity", "number", "total")),
+    "number_disclosed_tax_jurisdictions": (("tax", "jurisdictions"), ("disclosed",)),
+    "total_number_operating_jurisdictions": (("tax", "jurisdictions"), ("total",)),
+}
+
+# Per-unit intensities derived from absolute totals when the report gives production volume
+INTENSITY_FALLBACKS: Dict[str, Tuple[Tuple[str, ...], float]] = {
+    "company_ghg_emissions_per_unit_revenue": (("total", "ghg", "emissions"), 1),
+    "company_energy_consumption_per_unit_output": (("total", "energy", "consumption"), 1000),
+    "company_water_withdrawal_per_unit_output": (("total", "water", "withdrawal"), 1),
+}
+PRODUCTION_KEYS = (("vehicles", "manufactured"), ("vehicles", "produced"), ("units", "produced"), ("production", "volume"))
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Numbers as extracted by Gemini: plain numbers, strings with units/multipliers or {"value": ...}."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        number = convert_to_standard_unit(value)
+        return float(number) if number is not None else None
+    if isinstance(value, dict) and "value" in value:
+        return to_number(value["value"])
+    return None
+
+
+def _find_overall(overall_data: Dict[str, Any], key_terms: Tuple[str, ...], nested_terms: Tuple[str, ...] = ("total",)) -> Optional[float]:
+    for key, value in overall_data.items():
+        normalized = key.lower()
+        if not all(term in normalized for term in key_terms):
+            continue
+        if isinstance(value, dict) and "value" not in value:
+            for term in nested_terms:
+                for nested_key, nested_value in value.items():
+                    if term in nested_key.lower() and to_number(nested_value) is not None:
+                        return to_number(nested_value)
+            continue
+        number = to_number(value)
+        if number is not None:
+            return number
+    return None
+
+
+def resolve_inputs(result: Any, overall_data: Any) -> Dict[str, Optional[float]]:
+    """Formula inputs from `result`, falling back to `overall_data`."""
+    result = result if isinstance(result, dict) else {}
+    overall_data = overall_data if isinstance(overall_data, dict) else {}
+
+    inputs = {field: to_number(result.get(field)) for field in INPUT_FIELDS}
+    if not overall_data:
+        return inputs
+
+    for field, (key_terms, nested_terms) in OVERALL_DATA_KEYS.items():
+        if inputs[field] is None:
+            inputs[field] = _find_overall(overall_data, key_terms, nested_terms)
+
+    units = None
+    for field, (key_terms, per_units) in INTENSITY_FALLBACKS.items():
+        if inputs[field] is not None:
+            continue
+        total = _find_overall(overall_data, key_terms)
+        if total is None:
+            continue
+        if units is None:
+            units = next((n for terms in PRODUCTION_KEYS if (n := _find_overall(overall_data, terms))), 0)
+        if units:
+            inputs[field] = total / (units / per_units)
+    return inputs
+
+
+def _apply(subfactor: Subfactor, inputs: Dict[str, Optional[float]]) -> Optional[float]:
+    args = [inputs.get(field) for field in subfactor.inputs]
+    if any(arg is None for arg in args):
+        return None
+    try:
+        score = subfactor.formula(*args)
+    except ZeroDivisionError:
+        return None
+    low, high = subfactor.bounds
+    return round(float(min(max(score, low), high)), 2)
+
+
+def compute_subfactor_scores(result: Any, overall_data: Any) -> Dict[str, Dict[str, Optional[float]]]:
+    """Environmental/Social/Governance subfactor scores; null where the inputs are unavailable."""
+    return score_inputs(resolve_inputs(result, overall_data))
+
+
+def score_inputs(inputs: Dict[str, Optional[float]]) -> Dict[str, Dict[str, Optional[float]]]:
+    return {
+        category: {subfactor.name: _apply(subfactor, inputs) for subfactor in subfactors}
+        for category, subfactors in SUBFACTORS.items()
+    }
+
+
+def _load_fixture(path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with open(path) as f:
+        data = json.load(f)
+    if "result" in data and isinstance(data["result"], dict):
+        return data["result"], data.get("overall_data") or {}
+    return data, {}  # flat result-only fixture
+
+
+def _main(paths: List[str]):
+    """python -m app.services.esg_scoring [FIXTURE.json ...]  (defaults to extracted_reports/)"""
+    if not paths:
+        folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), "extracted_reports")
+        paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".json"))
+
+    for path in paths:
+        result, overall_data = _load_fixture(path)
+        scores = compute_subfactor_scores(result, overall_data)
+        runs = 2000
+        started = time.perf_counter()
+        for _ in range(runs):
+            compute_subfactor_scores(result, overall_data)
+        per_call_us = (time.perf_counter() - started) / runs * 1e6
+        print(f"== {os.path.basename(path)} ({per_call_us:.1f} µs/supplier)")
+        print(json.dumps(scores, indent=2))
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "1000"))
+
+
+class ExtractionCache:
+    """Extraction results keyed by SHA-256 of the uploaded file plus the prompt/model version.
+
+    Entries live in Mongo so they survive restarts; once the collection grows past
+    `max_entries` the least recently used entries are evicted.
+    """
+
+    def __init__(self, collection, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES):
+        self.collection = collection
+        self.max_entries = max_entries
+
+    @staticmethod
+    async def make_key(file_content: bytes, version: str) -> str:
+        # hashing a large report takes tens of milliseconds, keep it off the loop
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(file_content).hexdigest())
+        return f"{digest}:{version}"
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("last_access", ASCENDING)])
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$set": {"last_access": datetime.utcnow()}, "$inc": {"hits": 1}},
+            projection={"result": 1, "overall_data": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not entry:
+            return None
+        return {"result": entry["result"], "overall_data": entry["overall_data"]}
+
+    async def put(self, key: str, data: Dict[str, Any], filename: str):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "result": data.get("result"),
+                    "overall_data": data.get("overall_data"),
+                    "filename": filename,
+                    "last_access": now,
+                },
+                "$setOnInsert": {"created_at": now, "hits": 0},
+            },
+            upsert=True,
+        )
+        await self._evict()
+
+    async def invalidate(self, key: Optional[str] = None) -> int:
+        result = await self.collection.delete_many({"_id": key} if key else {})
+        return result.deleted_count
+
+    async def _evict(self):
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.collection.find({}, {"_id": 1}).sort("last_access", ASCENDING).limit(excess).to_list(length=excess)
+        await self.collection.delete_many({"_id": {"$in": [entry["_id"] for entry in stale]}})
+        logger.info(f"Evicted {len(stale)} extraction cache entries")
+
+
+extraction_cache = ExtractionCache(db.extraction_cache)
@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import httpx
+
+from app.services.http_client import get_http_client, HTTP_CONNECT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = "gemini-1.5-flash"
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# Outbound governor: sustained requests/second, burst size, parallel calls, and how long a
+# call may wait in the queue (including 429 back-off) before it is given up
+GEMINI_RATE_PER_SEC = float(os.getenv("GEMINI_RATE_PER_SEC", "5"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+
+RETRYABLE_STATUSES = (429, 503)
+
+
+class GeminiError(Exception):
+    """Non-200 answer (or unusable body) from the generateContent API."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Gemini API failed: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class GeminiGateway:
+    """Shared outbound gateway for Gemini traffic.
+
+    - identical prompts already in flight are collapsed into one upstream call (single-flight)
+    - a token bucket caps the request rate and a semaphore caps concurrent calls
+    - callers queue for both until a deadline instead of failing; 429/503 answers are retried
+      with back-off while the deadline allows
+    """
+
+    def __init__(self, rate_per_sec: float = GEMINI_RATE_PER_SEC, burst: int = GEMINI_BURST,
+                 max_concurrency: int = GEMINI_MAX_CONCURRENCY, queue_timeout: float = GEMINI_QUEUE_TIMEOUT,
+                 max_retries: int = GEMINI_MAX_RETRIES):
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "deadline_exceeded": 0}
+        self._waits = deque(maxlen=1000)
+
+    async def call(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.counters["requests"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        # shield: one caller disconnecting must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        deadline = time.monotonic() + self.queue_timeout
+        attempt = 0
+        while True:
+            await self._acquire(deadline)
+            try:
+                self.active += 1
+                self.counters["upstream_calls"] += 1
+                return await fn()
+            except GeminiError as e:
+                if e.status_code not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    raise
+                backoff = min(2 ** attempt, 8)
+                if time.monotonic() + backoff > deadline:
+                    raise
+                logger.warning(f"Gemini returned {e.status_code}, retrying in {backoff}s")
+            finally:
+                self.active -= 1
+                self._semaphore.release()
+            attempt += 1
+            self.counters["retries"] += 1
+            await asyncio.sleep(backoff)
+
+    async def _acquire(self, deadline: float):
+        """Wait for a concurrency slot and a rate token, or raise once the deadline passes."""
+        queued_at = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                self._deadline_exceeded()
+            try:
+                await self._take_token(deadline)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.queue_depth -= 1
+        self._waits.append(time.monotonic() - queued_at)
+
+    async def _take_token(self, deadline: float):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_sec)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = (1 - self._tokens) / self.rate_per_sec
+            if now + wait > deadline:
+                self._deadline_exceeded()
+            await asyncio.sleep(wait)
+
+    def _deadline_exceeded(self):
+        self.counters["deadline_exceeded"] += 1
+        raise GeminiError(503, f"Gemini request queue deadline of {self.queue_timeout}s exceeded")
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            **self.counters,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "active": self.active,
+            "inflight_keys": len(self._inflight),
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0,
+            "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0,
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0,
+            "limits": {
+                "rate_per_sec": self.rate_per_sec,
+                "burst": self.burst,
+                "max_concurrency": self.max_concurrency,
+                "queue_timeout": self.queue_timeout,
+            },
+        }
+
+
+gemini_gateway = GeminiGateway()
+
+
+async def _post_generate_content(prompt: str, model: str, timeout: Optional[float], api_key: Optional[str]) -> str:
+    response = await get_http_client().post(
+        GEMINI_API_URL.format(model=model),
+        params={"key": api_key or os.getenv("GEMINI_API_KEY")},
+        json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+        timeout=httpx.Timeout(timeout or GEMINI_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+    if response.status_code != 200:
+        raise GeminiError(response.status_code, response.text)
+
+    try:
+        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, ValueError) as e:
+        raise GeminiError(response.status_code, f"Unexpected response body ({e}): {response.text[:500]}")
+
+
+async def generate_content(prompt: str, *, model: str = GEMINI_MODEL, timeout: Optional[float] = None,
+                           api_key: Optional[str] = None) -> str:
+    """Send one user prompt to Gemini through the shared gateway and client and return the reply text."""
+    return await gemini_gateway.call(
+        (model, prompt),
+        lambda: _post_generate_content(prompt, model, timeout, api_key),
+    )
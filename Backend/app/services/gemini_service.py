@@ -1,71 +1,24 @@
-import google.generativeai as genai
 from fastapi import UploadFile
-import PyPDF2
-import io
+import asyncio
 import json
+import hashlib
 import os
 from typing import Dict, Any
 import logging
 import re
 
+from app.services.pdf_extraction import extract_pdf_pages
+from app.services.page_ranker import select_pages, ESG_PROMPT_TOKEN_BUDGET, ALWAYS_KEEP_PAGES
+from app.services.gemini_client import generate_content, GEMINI_MODEL
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class gemini_service:
-    def __init__(self, api_key: str):
-        try:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini. Check your API key. Error: {e}")
-            raise
-
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-            return text
-        except Exception as e:
-            logger.error(f"Error extracting text from PDF: {e}")
-            return ""
-
-    def _save_to_local_storage(self, filename: str, data: Dict[str, Any]):
-        try:
-            os.makedirs("extracted_reports", exist_ok=True)
-            base_name = os.path.splitext(os.path.basename(filename))[0]
-            output_file = f"extracted_reports/{base_name}_extracted.json"
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Successfully saved extracted data to {output_file}")
-            return output_file
-        except Exception as e:
-            logger.error(f"Error saving to local storage: {e}")
-            return None
-
-    def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
-        from json import JSONDecoder
-        decoder = JSONDecoder()
-        text = text.strip()
-        for i in range(len(text)):
-            try:
-                obj, end = decoder.raw_decode(text[i:])
-                return obj
-            except json.JSONDecodeError:
-                continue
-        return {}
-
-    async def extract_esg_data(self, file_content: bytes, filename: str) -> Dict[str, Any]:
-        logger.info("Starting Gemini 1.5 Flash ESG data extraction...")
-        try:
-            document_text = self.extract_text_from_pdf(file_content)
-            if not document_text.strip():
-                raise ValueError("No text could be extracted from the document.")
+MODEL_NAME = GEMINI_MODEL
+# The extraction prompt carries a whole report, give it longer than the default
+GEMINI_EXTRACTION_TIMEOUT = float(os.getenv("GEMINI_EXTRACTION_TIMEOUT", "180"))
 
-            prompt = """You are an expert ESG data extraction specialist.
+ESG_EXTRACTION_PROMPT = """You are an expert ESG data extraction specialist.
 
 From the following ESG report, extract as much **numerical ESG-related data** as possible to help derive key sustainability indicators. Focus on retrieving **exact values** for the following fields **if they are directly reported**. Use this strict JSON structure and field names if available. Return your response as a JSON object containing two top-level keys: `result` and `overall_data`:
 keep this json name as result. In result , must include the units of numerical values also along with value
@@ -145,10 +98,64 @@ ONLY return the JSON object above. Do not include explanations or extra text.
 
 Document text:
 
-""" + document_text
+"""
+
+# Changes whenever the model, the prompt or the page selection settings do; part of the extraction cache key
+EXTRACTION_VERSION = (
+    f"{MODEL_NAME}:{hashlib.sha256(ESG_EXTRACTION_PROMPT.encode('utf-8')).hexdigest()[:12]}"
+    f":{ESG_PROMPT_TOKEN_BUDGET}:{ALWAYS_KEEP_PAGES}"
+)
+
+class gemini_service:
+    def __init__(self, api_key: str):
+        if not api_key:
+            logger.error("Failed to initialize Gemini. GEMINI_API_KEY is not set.")
+        self.api_key = api_key
+
+    def _save_to_local_storage(self, filename: str, data: Dict[str, Any]):
+        try:
+            os.makedirs("extracted_reports", exist_ok=True)
+            base_name = os.path.splitext(os.path.basename(filename))[0]
+            output_file = f"extracted_reports/{base_name}_extracted.json"
+            with open(output_file, 'w') as f:
+                json.dump(data, f, indent=2)
+            logger.info(f"Successfully saved extracted data to {output_file}")
+            return output_file
+        except Exception as e:
+            logger.error(f"Error saving to local storage: {e}")
+            return None
+
+    def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
+        from json import JSONDecoder
+        decoder = JSONDecoder()
+        text = text.strip()
+        for i in range(len(text)):
+            try:
+                obj, end = decoder.raw_decode(text[i:])
+                return obj
+            except json.JSONDecodeError:
+                continue
+        return {}
+
+    async def extract_esg_data(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        logger.info("Starting Gemini 1.5 Flash ESG data extraction...")
+        try:
+            extraction = await extract_pdf_pages(file_content)
+            extraction_stats = extraction.stats()
+            logger.info(f"Extracted {filename}: {extraction_stats}")
+            if not extraction.text.strip():
+                raise ValueError("No text could be extracted from the document.")
+
+            # Only the pages most likely to hold the requested metrics go into the prompt
+            selection = await asyncio.to_thread(select_pages, extraction.pages)
+            logger.info(f"Page selection for {filename}: {selection.summary()}")
+
+            prompt = ESG_EXTRACTION_PROMPT + selection.text
 
-            response = self.model.generate_content(prompt)
-            raw_response = response.text.strip()
+            response_text = await generate_content(
+                prompt, model=MODEL_NAME, timeout=GEMINI_EXTRACTION_TIMEOUT, api_key=self.api_key
+            )
+            raw_response = response_text.strip()
             logger.info(f"Gemini raw response: {raw_response}")
 
             if raw_response.startswith("```json"):
@@ -174,6 +181,8 @@ Document text:
             return {
                 "result": result,
                 "overall_data": overall_data,
+                "extraction_stats": extraction_stats,
+                "page_selection": selection.summary(),
                 "status": "success"
             }
 
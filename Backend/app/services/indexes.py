@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, unique) for every field the request paths look documents up by
+REQUIRED_INDEXES: List[Tuple[str, List[Tuple[str, int]], bool]] = [
+    ("suppliers", [("email_domain", ASCENDING)], True),
+    ("suppliers", [("last_updated", ASCENDING)], False),  # supplier store polling, listing ETags
+    ("companies", [("email_domain", ASCENDING)], True),
+    ("users", [("email", ASCENDING)], True),
+]
+
+# (collection, filter) of the hot lookups, checked with explain() at startup
+KEY_QUERIES: List[Tuple[str, Dict[str, Any]]] = [
+    ("suppliers", {"email_domain": "example.com"}),
+    ("companies", {"email_domain": "example.com"}),
+    ("users", {"email": "someone@example.com"}),
+    ("suppliers", {"last_updated": {"$gt": datetime(1970, 1, 1)}}),
+]
+
+DUPLICATE_KEY = 11000
+
+
+def _index_name(keys: List[Tuple[str, int]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_indexes():
+    """Create the required indexes; a no-op for the ones that already exist.
+
+    A unique index that can't be built because the data holds duplicates is created as a plain
+    index instead, so lookups stay indexed, and the conflict is logged.
+    """
+    for collection_name, keys, unique in REQUIRED_INDEXES:
+        collection = db[collection_name]
+        name = _index_name(keys)
+        try:
+            await collection.create_index(keys, name=name, unique=unique)
+        except OperationFailure as e:
+            if e.code == DUPLICATE_KEY and unique:
+                logger.error(f"Duplicate {name} values in {collection_name}, creating a non-unique index: {e}")
+                await collection.create_index(keys, name=name)
+            else:
+                # typically an index on the same keys with other options; leave it as it is
+                logger.warning(f"Could not create index {name} on {collection_name}: {e}")
+    logger.info(f"Ensured {len(REQUIRED_INDEXES)} indexes")
+
+
+def _stages(plan: Any) -> Iterator[str]:
+    """Every stage name in an explain() plan tree, whatever the server version's layout."""
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+async def verify_query_plans() -> Dict[str, List[str]]:
+    """Explain the key queries and warn about any that would scan the whole collection."""
+    plans = {}
+    for collection_name, query in KEY_QUERIES:
+        label = f"{collection_name} {sorted(query)}"
+        try:
+            explained = await db[collection_name].find(query).limit(1).explain()
+        except Exception as e:
+            logger.warning(f"Could not explain {label}: {e}")
+            continue
+        winning = (explained.get("queryPlanner") or {}).get("winningPlan", explained)
+        stages = list(_stages(winning))
+        plans[label] = stages
+        if "COLLSCAN" in stages:
+            logger.warning(f"Query on {label} falls back to a collection scan (plan: {stages})")
+    return plans
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from bson import ObjectId
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, ReturnDocument
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A running job whose lease expires (process died mid-job) is picked up again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_SWEEP_SECONDS = int(os.getenv("JOB_SWEEP_SECONDS", "30"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobContext:
+    """Handed to job handlers to record stage timings and fetch the uploaded file."""
+
+    def __init__(self, queue: "JobQueue", job: Dict[str, Any]):
+        self.queue = queue
+        self.job = job
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        job_id = self.job["_id"]
+        started = time.perf_counter()
+        await self.queue._update(job_id, {
+            "current_stage": name,
+            f"stages.{name}": {"status": "running", "started_at": datetime.utcnow()},
+        }, renew_lease=True)
+        try:
+            yield
+        except Exception:
+            await self.queue._update(job_id, {
+                f"stages.{name}.status": "failed",
+                f"stages.{name}.seconds": round(time.perf_counter() - started, 3),
+            })
+            raise
+        await self.queue._update(job_id, {
+            f"stages.{name}.status": "succeeded",
+            f"stages.{name}.finished_at": datetime.utcnow(),
+            f"stages.{name}.seconds": round(time.perf_counter() - started, 3),
+        })
+
+    async def read_upload(self) -> bytes:
+        stream = await self.queue.uploads.open_download_stream(self.job["upload_id"])
+        return await stream.read()
+
+
+Handler = Callable[[Dict[str, Any], JobContext], Awaitable[Any]]
+
+
+class JobQueue:
+    """Mongo-backed job queue drained by a fixed number of asyncio workers.
+
+    Jobs and their uploads are stored in Mongo, so jobs that were queued or running
+    when the process stopped are picked up again after a restart.
+    """
+
+    def __init__(self, collection, uploads: AsyncIOMotorGridFSBucket, workers: int = JOB_WORKERS):
+        self.collection = collection
+        self.uploads = uploads
+        self.workers = workers
+        self.handlers: Dict[str, Handler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        # ids waiting in _queue, so the sweep doesn't enqueue a job twice
+        self._enqueued: Set[ObjectId] = set()
+        self._tasks = []
+
+    def register(self, kind: str, handler: Handler):
+        self.handlers[kind] = handler
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._enqueued = set()
+        await self._sweep()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any], upload: Optional[bytes] = None,
+                     filename: Optional[str] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "status": "queued",
+            "payload": payload,
+            "stages": {},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if upload is not None:
+            job["upload_id"] = await self.uploads.upload_from_stream(filename or "upload", upload)
+        inserted = await self.collection.insert_one(job)
+        self._enqueue(inserted.inserted_id)
+        return str(inserted.inserted_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await self.collection.find_one({"_id": ObjectId(job_id)}, {"lease_until": 0, "payload": 0})
+
+    async def _update(self, job_id: ObjectId, fields: Dict[str, Any], renew_lease: bool = False):
+        fields["updated_at"] = datetime.utcnow()
+        if renew_lease:
+            fields["lease_until"] = fields["updated_at"] + timedelta(seconds=JOB_LEASE_SECONDS)
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def _claim(self, job_id: ObjectId) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "updated_at": now,
+                    "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _enqueue(self, job_id: ObjectId):
+        if job_id not in self._enqueued:
+            self._enqueued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _sweep(self):
+        """Enqueue jobs nobody is working on: never started, or abandoned by a dead process.
+
+        Jobs still waiting in the in-memory queue are skipped; a running job is only picked up
+        again once its lease has expired.
+        """
+        cursor = self.collection.find(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": datetime.utcnow()}},
+            ]},
+            {"_id": 1},
+        ).sort("created_at", ASCENDING)
+        async for job in cursor:
+            self._enqueue(job["_id"])
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(JOB_SWEEP_SECONDS)
+            try:
+                await self._sweep()
+            except Exception as e:
+                logger.error(f"Job sweep failed: {e}")
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception(f"Job worker {index} crashed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: ObjectId):
+        job = await self._claim(job_id)
+        if not job:
+            return  # already taken by another worker/process, or finished
+
+        if job["attempts"] > JOB_MAX_ATTEMPTS:
+            await self._finish(job, "failed", error="Job exceeded the maximum number of attempts")
+            return
+
+        logger.info(f"Running job {job_id} ({job['kind']}), attempt {job['attempts']}")
+        try:
+            result = await self.handlers[job["kind"]](job, JobContext(self, job))
+        except HTTPException as e:
+            await self._finish(job, "failed", error=e.detail)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            await self._finish(job, "failed", error=str(e))
+        else:
+            await self._finish(job, "succeeded", result=result)
+
+    async def _finish(self, job: Dict[str, Any], status: str, result: Any = None, error: Any = None):
+        await self._update(job["_id"], {
+            "status": status,
+            "result": result,
+            "error": error,
+            "current_stage": None,
+            "finished_at": datetime.utcnow(),
+        })
+        if job.get("upload_id"):
+            try:
+                await self.uploads.delete(job["upload_id"])
+            except Exception as e:
+                logger.warning(f"Could not delete upload of job {job['_id']}: {e}")
+
+
+job_queue = JobQueue(db.jobs, AsyncIOMotorGridFSBucket(db, bucket_name="job_uploads"))
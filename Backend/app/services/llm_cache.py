@@ -0,0 +1,87 @@
+import os
+import re
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", "3600"))
+# Scores within the same bucket share a cache entry (e.g. 1.0 → 62.4 and 61.6 both become 62)
+RECOMMENDATION_SCORE_PRECISION = float(os.getenv("RECOMMENDATION_SCORE_PRECISION", "1.0"))
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str, precision: float) -> str:
+    """Lower-case, collapse whitespace and bucket score-like numbers.
+
+    Only numbers within ±100 are treated as scores; years and amounts are kept verbatim.
+    """
+    def bucket(match: re.Match) -> str:
+        value = float(match.group(0))
+        if abs(value) > 100 or precision <= 0:
+            return match.group(0)
+        return f"{round(value / precision) * precision:g}"
+
+    return _NUMBER_RE.sub(bucket, _SPACE_RE.sub(" ", prompt.strip().lower()))
+
+
+class LLMResponseCache:
+    """Bounded LRU + TTL cache in front of an LLM call.
+
+    Lookups and stores never await, so they are atomic on the event loop and need no lock;
+    only the (uncached) LLM call itself yields.
+    """
+
+    def __init__(self, maxsize: int = RECOMMENDATION_CACHE_SIZE, ttl: int = RECOMMENDATION_CACHE_TTL,
+                 precision: float = RECOMMENDATION_SCORE_PRECISION):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, kind: str, prompt: str) -> Tuple[str, str]:
+        return kind, normalize_prompt(prompt, self.precision)
+
+    async def get_or_compute(self, kind: str, prompt: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        key = self.make_key(kind, prompt)
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await compute()  # errors propagate and are not cached
+        self._cache[key] = value
+        return value
+
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        if kind is None:
+            removed = len(self._cache)
+            self._cache.clear()
+        else:
+            keys = [key for key in list(self._cache.keys()) if key[0] == kind]
+            for key in keys:
+                self._cache.pop(key, None)
+            removed = len(keys)
+        logger.info(f"Invalidated {removed} cached LLM responses (kind={kind})")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "score_precision": self.precision,
+        }
+
+
+recommendation_cache = LLMResponseCache()
@@ -0,0 +1,187 @@
+import math
+import os
+import re
+import sys
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Approximate prompt budget for the report text; 0 sends the full document
+ESG_PROMPT_TOKEN_BUDGET = int(os.getenv("ESG_PROMPT_TOKEN_BUDGET", "30000"))
+# Leading pages (cover, company name, reporting year) that are always kept
+ALWAYS_KEEP_PAGES = int(os.getenv("ESG_ALWAYS_KEEP_PAGES", "2"))
+
+CHARS_PER_TOKEN = 4
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Extra score per number on the page; data tables are what the prompt is after
+NUMBER_DENSITY_WEIGHT = 0.02
+
+# Vocabulary of the extraction prompt: the `result` field names and the `overall_data` checklist
+QUERY_TERMS = {
+    "ghg": 3, "emissions": 3, "scope": 2, "co2": 2, "co2e": 2, "tco2e": 2, "carbon": 1,
+    "energy": 2, "consumption": 1, "mwh": 2, "gj": 2, "renewable": 2, "electricity": 1,
+    "water": 2, "withdrawal": 2, "m3": 1,
+    "waste": 2, "recycled": 2, "recycling": 2, "landfill": 1,
+    "fines": 2, "penalties": 2, "penalty": 2, "environmental": 1,
+    "biodiversity": 2, "ecosystem": 1, "land": 1,
+    "climate": 1, "risk": 1, "mitigation": 1, "measures": 1,
+    "turnover": 2, "attrition": 2, "injury": 2, "ltifr": 2, "trir": 2, "safety": 1, "accidents": 1,
+    "diversity": 2, "female": 1, "women": 1, "minorities": 1, "employees": 2, "workforce": 1,
+    "community": 2, "social": 1, "contribution": 1, "donations": 1, "csr": 1, "invested": 1,
+    "revenue": 2, "sales": 1, "nps": 2, "satisfaction": 1, "promoter": 1,
+    "violations": 2, "grievances": 1, "training": 2, "hours": 1,
+    "directors": 2, "independent": 2, "board": 1, "ceo": 2, "pay": 1, "ratio": 1, "remuneration": 1,
+    "audit": 2, "committee": 1, "shareholder": 2, "shareholders": 2,
+    "disclosed": 1, "metrics": 1, "corruption": 2, "bribery": 1,
+    "tax": 2, "jurisdictions": 2, "countries": 1,
+}
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9]*")
+_NUMBER_RE = re.compile(r"\d[\d,]*\.?\d*")
+
+
+@dataclass
+class PageSelection:
+    """Pages chosen for the prompt, in document order."""
+    kept: List[int] = field(default_factory=list)  # 0-based page indexes
+    total_pages: int = 0
+    kept_tokens: int = 0
+    total_tokens: int = 0
+    text: str = ""
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "kept_pages": [i + 1 for i in self.kept],
+            "total_pages": self.total_pages,
+            "kept_tokens": self.kept_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def score_pages(pages: List[str]) -> List[float]:
+    """BM25 score of each page against QUERY_TERMS, plus a small bonus per number."""
+    page_terms = [Counter(_WORD_RE.findall(page.lower())) for page in pages]
+    lengths = [sum(terms.values()) for terms in page_terms]
+    avg_length = (sum(lengths) / len(lengths)) if lengths else 0
+    page_count = len(pages)
+
+    idf = {}
+    for term in QUERY_TERMS:
+        df = sum(1 for terms in page_terms if term in terms)
+        idf[term] = math.log((page_count - df + 0.5) / (df + 0.5) + 1)
+
+    scores = []
+    for page, terms, length in zip(pages, page_terms, lengths):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+        score = 0.0
+        for term, weight in QUERY_TERMS.items():
+            tf = terms.get(term)
+            if tf:
+                score += weight * idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        score += NUMBER_DENSITY_WEIGHT * len(_NUMBER_RE.findall(page))
+        scores.append(score)
+    return scores
+
+
+def select_pages(pages: List[str], token_budget: int = ESG_PROMPT_TOKEN_BUDGET) -> PageSelection:
+    """Keep the highest-scoring pages that fit into `token_budget` tokens."""
+    tokens = [estimate_tokens(page) if page else 0 for page in pages]
+    total_tokens = sum(tokens)
+    candidates = [i for i, page in enumerate(pages) if page.strip()]
+
+    if token_budget <= 0 or total_tokens <= token_budget:
+        kept = candidates
+    else:
+        scores = score_pages(pages)
+        leading = [i for i in candidates if i < ALWAYS_KEEP_PAGES]
+        ranked = leading + sorted(
+            (i for i in candidates if i >= ALWAYS_KEEP_PAGES), key=lambda i: scores[i], reverse=True
+        )
+        kept, used = [], 0
+        for i in ranked:
+            if used + tokens[i] > token_budget:
+                continue
+            kept.append(i)
+            used += tokens[i]
+        kept.sort()
+
+    return PageSelection(
+        kept=kept,
+        total_pages=len(pages),
+        kept_tokens=sum(tokens[i] for i in kept),
+        total_tokens=total_tokens,
+        text="\n".join(pages[i] for i in kept),
+    )
+
+
+# ---------- Evaluation against extracted_reports/ fixtures ----------
+
+def _numbers_in(value: Any) -> Iterable[float]:
+    if isinstance(value, bool):
+        return
+    if isinstance(value, (int, float)):
+        if value not in (0, 1):  # too common to tell anything
+            yield float(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _numbers_in(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _numbers_in(item)
+
+
+def value_recall(fixture: Dict[str, Any], text: str) -> Optional[float]:
+    """Share of the fixture's numeric values that occur somewhere in `text`."""
+    values = set(_numbers_in(fixture))
+    if not values:
+        return None
+    found = set()
+    for match in _NUMBER_RE.findall(text):
+        try:
+            found.add(float(match.replace(",", "").rstrip(".")))
+        except ValueError:
+            continue
+    return round(len(values & found) / len(values), 3)
+
+
+def _main(argv: List[str]):
+    """python -m app.services.page_ranker REPORT.pdf [FIXTURE.json] [--budget N]"""
+    from app.services.pdf_extraction import extract_page_range
+    import PyPDF2, io
+
+    budget = ESG_PROMPT_TOKEN_BUDGET
+    if "--budget" in argv:
+        at = argv.index("--budget")
+        budget = int(argv[at + 1])
+        argv = argv[:at] + argv[at + 2:]
+    if not argv:
+        print(_main.__doc__)
+        return
+
+    with open(argv[0], "rb") as f:
+        content = f.read()
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(content)).pages)
+    pages = [text for _, text, _ in extract_page_range(content, 0, page_count)]
+    selection = select_pages(pages, budget)
+    report = selection.summary()
+    report["token_reduction"] = round(1 - selection.kept_tokens / selection.total_tokens, 3) if selection.total_tokens else 0
+
+    if len(argv) > 1:
+        with open(argv[1]) as f:
+            fixture = json.load(f)
+        report["value_recall_full_text"] = value_recall(fixture, "\n".join(pages))
+        report["value_recall_selected"] = value_recall(fixture, selection.text)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,143 @@
+import asyncio
+import io
+import os
+import time
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import PyPDF2
+
+from app.services.process_pool import get_process_pool, shutdown_process_pool, PROCESS_POOL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Documents shorter than this are parsed in a thread; the process hop isn't worth it
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+# Smallest page range handed to one worker
+MIN_PAGES_PER_CHUNK = int(os.getenv("PDF_MIN_PAGES_PER_CHUNK", "8"))
+
+
+@dataclass
+class PdfExtraction:
+    """Per-page text of a PDF plus the time spent extracting each page."""
+    pages: List[str] = field(default_factory=list)
+    page_seconds: List[float] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    @property
+    def text(self) -> str:
+        # single join instead of repeated `text += page_text`
+        return "\n".join(page for page in self.pages if page)
+
+    def stats(self) -> Dict[str, Any]:
+        page_count = len(self.pages)
+        cpu_seconds = sum(self.page_seconds)
+        slowest = sorted(range(page_count), key=lambda i: self.page_seconds[i], reverse=True)[:5]
+        return {
+            "page_count": page_count,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "avg_ms_per_page": round(cpu_seconds * 1000 / page_count, 2) if page_count else 0,
+            "slowest_pages": [
+                {"page": i + 1, "ms": round(self.page_seconds[i] * 1000, 2)} for i in slowest
+            ],
+        }
+
+
+def _count_pages(file_content: bytes) -> int:
+    return len(PyPDF2.PdfReader(io.BytesIO(file_content)).pages)
+
+
+def extract_page_range(file_content: bytes, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    """Extract pages [start, stop) of a PDF held in memory."""
+    return _extract_pages(PyPDF2.PdfReader(io.BytesIO(file_content)), start, stop)
+
+
+# The document the worker process last read: (shared memory name, reader)
+_worker_document: Optional[Tuple[str, PyPDF2.PdfReader]] = None
+
+
+def extract_shared_page_range(name: str, size: int, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    """Extract pages [start, stop) of the PDF in shared memory block `name`.
+
+    Runs inside a pool worker, so it must stay module-level. Only the block's name crosses the
+    process boundary; each worker copies and parses a document once, however many of its
+    page ranges it gets.
+    """
+    global _worker_document
+    if _worker_document is None or _worker_document[0] != name:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            content = bytes(block.buf[:size])
+        finally:
+            block.close()  # the parent unlinks it (spawned workers share its resource tracker)
+        _worker_document = (name, PyPDF2.PdfReader(io.BytesIO(content)))
+    return _extract_pages(_worker_document[1], start, stop)
+
+
+def _extract_pages(reader: PyPDF2.PdfReader, start: int, stop: int) -> List[Tuple[int, str, float]]:
+    pages = []
+    for index in range(start, stop):
+        started = time.perf_counter()
+        try:
+            text = reader.pages[index].extract_text() or ""
+        except Exception as e:
+            logger.warning(f"Could not extract text from page {index + 1}: {e}")
+            text = ""
+        pages.append((index, text, time.perf_counter() - started))
+    return pages
+
+
+def _split_range(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    # Two chunks per worker so one slow (image heavy) range doesn't hold up the rest
+    chunk_count = max(1, min(workers * 2, page_count // MIN_PAGES_PER_CHUNK))
+    size, extra = divmod(page_count, chunk_count)
+    ranges, start = [], 0
+    for i in range(chunk_count):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+async def extract_pdf_pages(file_content: bytes) -> PdfExtraction:
+    """Extract the text of every page without blocking the event loop."""
+    started = time.perf_counter()
+    try:
+        page_count = await asyncio.to_thread(_count_pages, file_content)
+    except Exception as e:
+        logger.error(f"Error reading PDF: {e}")
+        return PdfExtraction()
+
+    if page_count < PARALLEL_MIN_PAGES:
+        chunks = [await asyncio.to_thread(extract_page_range, file_content, 0, page_count)]
+    else:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        # one copy of the document for all workers instead of one pickled copy per page range
+        block = shared_memory.SharedMemory(create=True, size=len(file_content))
+        try:
+            block.buf[:len(file_content)] = file_content
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(pool, extract_shared_page_range, block.name, len(file_content), start, stop)
+                for start, stop in _split_range(page_count, PROCESS_POOL_WORKERS)
+            ])
+        except Exception as e:
+            logger.warning(f"Process pool extraction failed, falling back to a thread: {e}")
+            if isinstance(e, BrokenProcessPool):
+                shutdown_process_pool()
+            chunks = [await asyncio.to_thread(extract_page_range, file_content, 0, page_count)]
+        finally:
+            block.close()
+            block.unlink()
+
+    extraction = PdfExtraction(pages=[""] * page_count, page_seconds=[0.0] * page_count)
+    for chunk in chunks:
+        for index, text, seconds in chunk:
+            extraction.pages[index] = text
+            extraction.page_seconds[index] = seconds
+    extraction.wall_seconds = time.perf_counter() - started
+    return extraction
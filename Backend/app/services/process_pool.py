@@ -0,0 +1,34 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes shared by the CPU-bound services (PDF parsing, ...)
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the application-wide process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        # spawn keeps the workers free of the event loop / Mongo client threads of the parent
+        _pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Started process pool with {PROCESS_POOL_WORKERS} workers")
+    return _pool
+
+
+def shutdown_process_pool():
+    """Shut the process pool down (called from the app lifespan)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        logger.info("Process pool shut down")
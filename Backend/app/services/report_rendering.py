@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from app.services.process_pool import get_process_pool, shutdown_process_pool
+
+logger = logging.getLogger(__name__)
+
+# Rendered PDFs kept in memory, bounded by their total size
+REPORT_CACHE_BYTES = int(os.getenv("REPORT_CACHE_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "3600"))
+
+
+# ---------- RENDERING (runs in the process pool workers) ----------
+_styles: Optional[Dict[str, Any]] = None
+
+
+def report_styles() -> Dict[str, Any]:
+    """Paragraph and table styles, built once per process instead of once per report."""
+    global _styles
+    if _styles is None:
+        sheet = getSampleStyleSheet()
+        header_table = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0B3954")),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.8, colors.grey),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ]
+        _styles = {
+            "title": ParagraphStyle(
+                name="TitleStyle",
+                fontSize=20,
+                leading=24,
+                spaceAfter=20,
+                alignment=1,  # Center
+                textColor=colors.HexColor("#0B3954"),
+            ),
+            "heading2": sheet["Heading2"],
+            "heading3": sheet["Heading3"],
+            "body": sheet["BodyText"],
+            "italic": sheet["Italic"],
+            "score_table": TableStyle(header_table),
+            "subfactor_table": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ]),
+        }
+    return _styles
+
+
+def render_report(data: Dict[str, Any]) -> bytes:
+    """The ESG evaluation report PDF for an ESGReportInput payload (as a dict)."""
+    styles = report_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    elements = []
+
+    # Title
+    elements.append(Paragraph(f"ESG Evaluation Report - {data['company_name']}", styles["title"]))
+    elements.append(Spacer(1, 12))
+
+    # Category Scores Table
+    elements.append(Paragraph("1. ESG Category Scores", styles["heading2"]))
+    cat_table_data = [["Category", "Score"]]
+    for category, score in data["esg_category_scores"].items():
+        cat_table_data.append([category, f"{score:.2f} / 100"])
+    cat_table = Table(cat_table_data, hAlign='LEFT', colWidths=[200, 200])
+    cat_table.setStyle(styles["score_table"])
+    elements.append(cat_table)
+    elements.append(Spacer(1, 16))
+
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("2. Additional Scores", styles["heading2"]))
+    additional_table_data = [
+        ["Score Type", "Score"],
+        ["Cost Efficiency Score", f"{data['cost_score']:.2f} / 100"],
+        ["Risk Score", f"{data['risk_score']:.2f} / 100"],
+        ["Reliability Score", f"{data['reliability_score']:.2f} / 100"],
+    ]
+    add_table = Table(additional_table_data, hAlign='LEFT', colWidths=[200, 200])
+    add_table.setStyle(styles["score_table"])
+    elements.append(add_table)
+    elements.append(Spacer(1, 16))
+
+    # Subfactor Scores
+    elements.append(Paragraph("2. ESG Subfactor Scores", styles["heading2"]))
+    for category, subfactors in data["esg_final_subfactor_scores"].items():
+        elements.append(Paragraph(f"{category}", styles["heading3"]))
+        sub_table_data = [["Subfactor", "Score"]]
+        for subfactor, score in subfactors.items():
+            sub_table_data.append([subfactor, f"{score:.2f} / 100"])
+        sub_table = Table(sub_table_data, hAlign='LEFT', colWidths=[250, 150])
+        sub_table.setStyle(styles["subfactor_table"])
+        elements.append(sub_table)
+        elements.append(Spacer(1, 12))
+
+    # Recommendations
+    if data.get("recommendations"):
+        elements.append(Paragraph("3. Recommended Improvements", styles["heading2"]))
+        for tip in data["recommendations"]:
+            elements.append(Paragraph(tip, styles["body"]))
+        elements.append(Spacer(1, 16))
+
+    # Footer
+    elements.append(Spacer(1, 20))
+    elements.append(Paragraph("Generated by SustainPro", styles["italic"]))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# ---------- CACHE ----------
+def payload_key(data: Dict[str, Any]) -> str:
+    """sha256 of the payload. Keys are not sorted: their order is the order of the report's tables."""
+    return hashlib.sha256(json.dumps(data, separators=(",", ":")).encode()).hexdigest()
+
+
+class ReportRenderer:
+    """Renders reports in the shared process pool, caching the PDFs by payload hash.
+
+    Identical payloads already being rendered share one render. The cache is bounded by the
+    total size of the PDFs; lookups and stores never await, so they need no lock.
+    """
+
+    def __init__(self, max_bytes: int = REPORT_CACHE_BYTES, ttl: int = REPORT_CACHE_TTL):
+        self._cache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=len)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"hits": 0, "renders": 0, "coalesced": 0}
+        self.render_seconds = 0.0
+
+    async def render(self, data: Dict[str, Any]) -> bytes:
+        key = payload_key(data)
+        pdf = self._cache.get(key)
+        if pdf is not None:
+            self.counters["hits"] += 1
+            return pdf
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(key, data))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _render(self, key: str, data: Dict[str, Any]) -> bytes:
+        self.counters["renders"] += 1
+        started = time.perf_counter()
+        try:
+            pdf = await asyncio.get_running_loop().run_in_executor(get_process_pool(), render_report, data)
+        except BrokenProcessPool as e:
+            logger.warning(f"Process pool broken, rendering report in a thread: {e}")
+            shutdown_process_pool()
+            pdf = await asyncio.to_thread(render_report, data)
+        self.render_seconds += time.perf_counter() - started
+        if len(pdf) <= self._cache.maxsize:
+            self._cache[key] = pdf
+        return pdf
+
+    def stats(self) -> Dict[str, Any]:
+        renders = self.counters["renders"]
+        return {
+            **self.counters,
+            "render_ms_avg": round(self.render_seconds / renders * 1000, 1) if renders else 0,
+            "cached_reports": len(self._cache),
+            "cached_bytes": self._cache.currsize,
+            "max_bytes": self._cache.maxsize,
+        }
+
+
+report_renderer = ReportRenderer()
+
+
+# ---------- BENCHMARK ----------
+def sample_payload(subfactors: int, seed: int = 0) -> Dict[str, Any]:
+    categories = ("Environmental", "Social", "Governance")
+    return {
+        "company_name": f"Bench Supplier {seed}",
+        "esg_category_scores": {category: 50.0 + n + seed % 10 for n, category in enumerate(categories)},
+        "esg_final_subfactor_scores": {
+            category: {f"{category} subfactor {i}": (i * 7 + seed) % 100 for i in range(subfactors)}
+            for category in categories
+        },
+        "recommendations": [f"Recommendation {i}: improve disclosure of subfactor {i}." for i in range(10)],
+        "cost_score": 61.5,
+        "risk_score": 42.0,
+        "reliability_score": 77.25,
+    }
+
+
+def bench(reports: int, subfactors: int) -> Dict[str, Any]:
+    """Reports per second on one core: styles rebuilt per report (before), built once (after)."""
+    payloads = [sample_payload(subfactors, seed) for seed in range(reports)]
+
+    def rate(fresh_styles: bool) -> float:
+        global _styles
+        started = time.perf_counter()
+        for payload in payloads:
+            if fresh_styles:
+                _styles = None
+            render_report(payload)
+        return round(reports / (time.perf_counter() - started), 1)
+
+    render_report(payloads[0])  # warm up imports and fonts
+    before, after = rate(True), rate(False)
+
+    async def cached() -> float:
+        renderer = ReportRenderer()
+        renderer._cache[payload_key(payloads[0])] = render_report(payloads[0])
+        started = time.perf_counter()
+        for _ in range(reports):
+            await renderer.render(payloads[0])
+        return round(reports / (time.perf_counter() - started), 1)
+
+    return {
+        "reports": reports,
+        "subfactors_per_category": subfactors,
+        "pdf_bytes": len(render_report(payloads[0])),
+        "reports_per_second_per_core": {"styles_per_report": before, "styles_per_worker": after,
+                                        "cache_hit": asyncio.run(cached())},
+    }
+
+
+def _main():
+    """python -m app.services.report_rendering [--reports N] [--subfactors N]"""
+    parser = argparse.ArgumentParser(description="Benchmark ESG report PDF rendering")
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--subfactors", type=int, default=20, help="subfactors per ESG category")
+    args = parser.parse_args()
+    print(bench(args.reports, args.subfactors))
+
+
+if __name__ == "__main__":
+    _main()
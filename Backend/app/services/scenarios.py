@@ -0,0 +1,103 @@
+import os
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.supplier_store import CRITERIA
+
+# upper bound for the rank matrix (scenarios × suppliers, int32)
+SCENARIO_MAX_CELLS = int(os.getenv("SCENARIO_MAX_CELLS", "25000000"))
+
+# The trade-off simulator's presets
+PRESETS: Dict[str, Dict[str, float]] = {
+    "Cost Focused": {"cost": 50, "sustainability": 20, "risk": 15, "reliability": 15},
+    "Sustainability First": {"cost": 15, "sustainability": 50, "risk": 20, "reliability": 15},
+    "Risk Averse": {"cost": 20, "sustainability": 25, "risk": 40, "reliability": 15},
+    "Reliability Priority": {"cost": 20, "sustainability": 20, "risk": 15, "reliability": 45},
+    "Balanced": {"cost": 25, "sustainability": 25, "risk": 25, "reliability": 25},
+}
+
+CRITERIA_ORDER = tuple(CRITERIA)
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([float(weights.get(name, 0)) for name in CRITERIA_ORDER])
+
+
+def grid_weights(step: int) -> np.ndarray:
+    """Every weight vector with entries that are multiples of `step` and sum to 100.
+
+    `step` must divide 100 (5, 10, 20, 25, 50, ...), otherwise no multiples sum to exactly 100.
+    """
+    if step <= 0 or 100 % step:
+        raise ValueError(f"grid step {step} does not divide 100")
+    parts = 100 // step
+    count = len(CRITERIA_ORDER)
+    vectors = []
+    # stars and bars: choose where the count-1 bars go among parts+count-1 slots
+    for bars in combinations(range(parts + count - 1), count - 1):
+        edges = (-1,) + bars + (parts + count - 1,)
+        vectors.append([(edges[i + 1] - edges[i] - 1) * step for i in range(count)])
+    return np.array(vectors, dtype=float)
+
+
+def dirichlet_weights(around: np.ndarray, samples: int, concentration: float, seed: Optional[int]) -> np.ndarray:
+    """Weight vectors scattered around `around`; higher concentration keeps them closer."""
+    rng = np.random.default_rng(seed)
+    mean = around / around.sum()
+    alpha = np.maximum(mean * concentration, 1e-3)  # a zero weight stays (almost) zero
+    return rng.dirichlet(alpha, size=samples) * 100
+
+
+def rank_matrix(points: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores (scenarios × suppliers) in one matrix product, and 0-based ranks per scenario.
+
+    Scenario-major, so every per-scenario sort runs over contiguous memory.
+    """
+    scores = (weights.astype(np.float32) / 100) @ points.astype(np.float32).T
+    order = np.argsort(-scores, axis=1)
+    ranks = np.empty(order.shape, dtype=np.int32)
+    np.put_along_axis(ranks, order, np.arange(points.shape[0], dtype=np.int32)[None, :], axis=1)
+    return scores, ranks
+
+
+def rank_statistics(ranks: np.ndarray, top_k: int) -> Dict[str, np.ndarray]:
+    """Per-supplier mean/min/max rank (1-based) and top-k frequency over all scenarios."""
+    return {
+        "mean": ranks.mean(axis=0) + 1,
+        "min": ranks.min(axis=0) + 1,
+        "max": ranks.max(axis=0) + 1,
+        "top_k_probability": (ranks < top_k).mean(axis=0),
+    }
+
+
+def rank_percentiles(ranks: np.ndarray) -> Dict[str, np.ndarray]:
+    """5th/50th/95th rank percentile (1-based) of the given supplier columns; only run on the few shown."""
+    p5, median, p95 = np.percentile(ranks, [5, 50, 95], axis=0) + 1
+    return {"p5": p5, "median": median, "p95": p95}
+
+
+def rank_flips(points: np.ndarray, base: np.ndarray, order: np.ndarray) -> List[Dict[str, Optional[float]]]:
+    """For each consecutive pair in `order` under the `base` weights: how many percentage points one
+    criterion's weight has to move (others unchanged) before the lower supplier overtakes the upper.
+
+    None means no change of that weight alone can swap them.
+    """
+    upper, lower = points[order[:-1]], points[order[1:]]
+    gap = (upper - lower) @ base / 100  # ≥ 0
+    difference = upper - lower  # per criterion
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = -100 * gap[:, None] / difference
+    flips = []
+    for i in range(len(order) - 1):
+        thresholds = {}
+        for j, name in enumerate(CRITERIA_ORDER):
+            change = delta[i, j]
+            # the weight can't go negative, and a zero difference never closes the gap
+            if not np.isfinite(change) or base[j] + change < 0:
+                thresholds[name] = None
+            else:
+                thresholds[name] = round(float(change), 2)
+        flips.append(thresholds)
+    return flips
@@ -0,0 +1,161 @@
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+# Bucket granularity of the time-series collection; scores change a few times a day at most
+SCORE_HISTORY_GRANULARITY = os.getenv("SCORE_HISTORY_GRANULARITY", "hours")
+
+SCORE_FIELDS = {"E_score": "esg_E_score", "S_score": "esg_S_score", "G_score": "esg_G_score", "ESG_score": "esg_final_score"}
+INTERVALS = ("day", "week", "month")
+
+
+class ScoreHistory:
+    """Append-only ESG score history in a Mongo time-series collection.
+
+    One measurement per (re)score: time `ts`, meta `supplier` ({id, industry}) and the four
+    scores. Mongo buckets the measurements per supplier and time range, and trend queries
+    are a single aggregation: match on the meta field and time range, truncate the time to
+    the interval, then min/max/avg/last per bucket.
+    """
+
+    def __init__(self, database, name: str = "esg_score_history"):
+        self.database = database
+        self.name = name
+        self.collection = database[name]
+
+    async def ensure_ready(self):
+        """Create the time-series collection on first start and seed it with the current scores."""
+        if await self.database.list_collection_names(filter={"name": self.name}):
+            return
+        try:
+            await self.database.create_collection(
+                self.name,
+                timeseries={"timeField": "ts", "metaField": "supplier", "granularity": SCORE_HISTORY_GRANULARITY},
+            )
+        except CollectionInvalid:
+            return  # created by another instance in the meantime
+        except OperationFailure as e:
+            # servers before 5.0: a plain collection with the same indexes works, just bigger
+            # (the trend pipelines avoid 5.0-only operators)
+            logger.warning(f"Time-series collections unavailable ({e}); using a plain collection for score history")
+        await self.collection.create_index([("supplier.id", ASCENDING), ("ts", ASCENDING)])
+        await self.collection.create_index([("supplier.industry", ASCENDING), ("ts", ASCENDING)])
+        seeded = await self.backfill()
+        logger.info(f"Created {self.name} with {seeded} current scores")
+
+    async def backfill(self) -> int:
+        cursor = db.suppliers.find(
+            {"esg_final_score": {"$exists": True}},
+            {"industry": 1, "last_updated": 1, **{field: 1 for field in SCORE_FIELDS.values()}},
+        )
+        points = [self.point(supplier["_id"], supplier.get("industry"), supplier, supplier.get("last_updated"))
+                  async for supplier in cursor]
+        if points:
+            await self.collection.insert_many(points, ordered=False)
+        return len(points)
+
+    # ---------- WRITE ----------
+    @staticmethod
+    def point(supplier_id: ObjectId, industry: Optional[str], scores: Dict[str, Any],
+              ts: Optional[datetime] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        """A measurement from supplier-style score fields (esg_final_score, ...)."""
+        point = {
+            "ts": ts or datetime.utcnow(),
+            "supplier": {"id": supplier_id, "industry": (industry or "").strip().lower() or "unknown"},
+            **{name: scores.get(field) for name, field in SCORE_FIELDS.items()},
+        }
+        if source:
+            point["source"] = source
+        return point
+
+    async def record(self, supplier_id: ObjectId, industry: Optional[str], scores: Dict[str, Any], source: str):
+        await self.collection.insert_one(self.point(supplier_id, industry, scores, source=source))
+
+    async def record_many(self, points: List[Dict[str, Any]]):
+        if points:
+            await self.collection.insert_many(points, ordered=False)
+
+    # ---------- TRENDS ----------
+    @staticmethod
+    def _bucket(interval: str) -> Dict[str, Any]:
+        """Start (UTC) of the day, ISO week (from Monday) or month of `ts`.
+
+        Built from date parts rather than $dateTrunc, which needs MongoDB 5.0, so the trends
+        also work on the plain collection used on older servers.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {INTERVALS}")
+        if interval == "week":
+            parts = {"isoWeekYear": {"$isoWeekYear": "$ts"}, "isoWeek": {"$isoWeek": "$ts"}, "isoDayOfWeek": 1}
+        else:
+            parts = {"year": {"$year": "$ts"}, "month": {"$month": "$ts"}}
+            if interval == "day":
+                parts["day"] = {"$dayOfMonth": "$ts"}
+        return {"$dateFromParts": parts}
+
+    @staticmethod
+    def _match(meta: Dict[str, Any], start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+        match = dict(meta)
+        if start or end:
+            match["ts"] = {**({"$gte": start} if start else {}), **({"$lt": end} if end else {})}
+        return match
+
+    async def supplier_trend(self, supplier_id: ObjectId, interval: str,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Per bucket: number of scorings and min/max/avg/last of each score."""
+        pipeline = [
+            {"$match": self._match({"supplier.id": supplier_id}, start, end)},
+            {"$sort": {"ts": 1}},
+            {"$group": {
+                "_id": self._bucket(interval),
+                "scorings": {"$sum": 1},
+                **{f"{name}_{stat}": {f"${stat}": f"${name}"} for name in SCORE_FIELDS for stat in ("min", "max", "avg", "last")},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        return [self._shape(doc, {"scorings": doc["scorings"]}) async for doc in self.collection.aggregate(pipeline)]
+
+    async def portfolio_trend(self, industry: Optional[str], interval: str,
+                              start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Per bucket, over every supplier scored in it (its last score in the bucket): min/max/avg of each score."""
+        meta = {"supplier.industry": industry.strip().lower()} if industry else {}
+        pipeline = [
+            {"$match": self._match(meta, start, end)},
+            {"$sort": {"ts": 1}},
+            # one value per supplier and bucket first, so frequently rescored suppliers don't weigh more
+            {"$group": {
+                "_id": {"bucket": self._bucket(interval), "supplier": "$supplier.id"},
+                **{name: {"$last": f"${name}"} for name in SCORE_FIELDS},
+            }},
+            {"$group": {
+                "_id": "$_id.bucket",
+                "suppliers": {"$sum": 1},
+                **{f"{name}_{stat}": {f"${stat}": f"${name}"} for name in SCORE_FIELDS for stat in ("min", "max", "avg")},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        return [self._shape(doc, {"suppliers": doc["suppliers"]}) async for doc in self.collection.aggregate(pipeline)]
+
+    @staticmethod
+    def _shape(doc: Dict[str, Any], counts: Dict[str, int]) -> Dict[str, Any]:
+        """{"bucket", <counts>, "E_score": {"min", "max", "avg", ...}, ...} from the flat $group output."""
+        shaped = {"bucket": doc["_id"], **counts}
+        for name in SCORE_FIELDS:
+            shaped[name] = {
+                stat: (round(doc[key], 2) if isinstance(doc[key], (int, float)) else doc[key])
+                for stat in ("min", "max", "avg", "last")
+                if (key := f"{name}_{stat}") in doc
+            }
+        return shaped
+
+
+score_history = ScoreHistory(db)
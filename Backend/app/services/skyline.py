@@ -0,0 +1,67 @@
+from typing import List
+
+import numpy as np
+
+SKYLINE_BLOCK = 1024
+WINDOW_CHUNK = 64
+
+
+def _dominated_by(window: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """For each point, whether some window point is at least as good everywhere and better somewhere.
+
+    The window is scanned in chunks, strongest points first, and points already known to be
+    dominated are dropped before the next chunk, so most of the work happens on few points.
+    """
+    alive = np.ones(len(points), dtype=bool)
+    for start in range(0, len(window), WINDOW_CHUNK):
+        candidates = np.flatnonzero(alive)
+        if not len(candidates):
+            break
+        chunk = window[start:start + WINDOW_CHUNK]
+        subset = points[candidates]
+        # one 2-D comparison per objective; much cheaper than reducing over a tiny third axis
+        at_least = np.ones((len(candidates), len(chunk)), dtype=bool)
+        better = np.zeros_like(at_least)
+        for j in range(points.shape[1]):
+            mine, theirs = subset[:, j, None], chunk[None, :, j]
+            at_least &= theirs >= mine
+            better |= theirs > mine
+        alive[candidates[(at_least & better).any(axis=1)]] = False
+    return ~alive
+
+
+def skyline(points: np.ndarray) -> np.ndarray:
+    """Indices of the non-dominated rows of `points` (every column: higher is better).
+
+    Sort-filter-skyline: rows are visited in descending order of their sum, so no row can be
+    dominated by one visited after it and every accepted row is final. Rows are checked
+    against the window (the skyline so far) block by block with NumPy, then the survivors of
+    a block against each other.
+    """
+    order = np.argsort(-points.sum(axis=1), kind="stable")
+    window = np.empty((0, points.shape[1]))
+    accepted: List[int] = []
+
+    for start in range(0, len(order), SKYLINE_BLOCK):
+        block = order[start:start + SKYLINE_BLOCK]
+        survivors = block[~_dominated_by(window, points[block])]
+        # dominance is transitive, so checking against all survivors of the block (dominated or
+        # not) gives the same answer as checking against the block's skyline only
+        kept = survivors[~_dominated_by(points[survivors], points[survivors])]
+        if len(kept):
+            accepted.extend(kept.tolist())
+            window = np.vstack([window, points[kept]])
+    return np.array(accepted, dtype=int)
+
+
+def skyline_layers(points: np.ndarray, layers: int) -> List[np.ndarray]:
+    """The first `layers` Pareto fronts: the skyline, then the skyline of what remains, and so on."""
+    remaining = np.arange(len(points))
+    fronts = []
+    for _ in range(layers):
+        if not len(remaining):
+            break
+        front = remaining[skyline(points[remaining])]
+        fronts.append(front)
+        remaining = np.setdiff1d(remaining, front, assume_unique=True)
+    return fronts
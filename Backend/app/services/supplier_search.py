@@ -0,0 +1,265 @@
+import re
+import time
+import logging
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.supplier_store import SupplierStore, COLUMNS, CRITERIA, supplier_store
+
+logger = logging.getLogger(__name__)
+
+# Columns with score-band facets: 20-point bands over 0-100 (100 falls in the last band)
+BAND_COLUMNS = tuple(CRITERIA.values())
+BAND_WIDTH = 20
+BAND_COUNT = 100 // BAND_WIDTH
+BAND_LABELS = tuple(f"{n * BAND_WIDTH}-{(n + 1) * BAND_WIDTH}" for n in range(BAND_COUNT)) + ("unscored",)
+# Share of query trigrams a name has to contain to match
+MIN_COVERAGE = 0.5
+# Deleted/renamed documents stay in the postings until they make up this share of the index
+COMPACT_RATIO = 0.25
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Lowercased ASCII words: accents stripped, punctuation treated as a separator."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return [word for word in _NON_WORD.split(text) if word]
+
+
+def trigrams(text: Optional[str], prefix: bool = False) -> List[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind.
+
+    With prefix=True the last word is left open at the end, so "acm" matches "acme".
+    """
+    words = normalize(text)
+    grams = set()
+    for n, word in enumerate(words):
+        padded = "  " + word + ("" if prefix and n == len(words) - 1 else " ")
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return sorted(grams)
+
+
+class SupplierSearchIndex:
+    """In-process trigram index over company names, with industry and score-band facets.
+
+    Every supplier gets a document id; postings map a trigram to the ids of the names that
+    contain it. A query counts shared trigrams for all candidates at once with np.bincount
+    over the query's postings. Industry codes and scores are NumPy columns by document id,
+    so filters are masks and facet counts are bincounts over the matching ids.
+
+    Follows the supplier store: upserts and deletions are applied incrementally (a renamed
+    or deleted supplier's old id is only marked dead and compacted away later), and a store
+    reload rebuilds the index.
+    """
+
+    def __init__(self, store: SupplierStore):
+        self.store = store
+        self._clear()
+
+    def _clear(self):
+        self.docs = 0
+        self.keys: List[str] = []
+        self.doc_of: Dict[str, int] = {}
+        self.texts: List[Optional[str]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.gram_counts = np.zeros(0, dtype=np.int32)
+        self.industry_codes = np.zeros(0, dtype=np.int32)
+        self.values = {column: np.zeros(0) for column in COLUMNS}
+        self.band_codes = {column: np.zeros(0, dtype=np.int8) for column in BAND_COLUMNS}
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self._arrays: Dict[str, np.ndarray] = {}
+        self.dead = 0
+
+    def attach(self):
+        self.store.add_listener(self.on_change)
+
+    def on_change(self, event: str, row: Optional[Dict[str, Any]]):
+        if event == "reload":
+            self.rebuild()
+        elif event == "upsert":
+            self.upsert(row)
+        elif event == "delete":
+            self.remove(row["email_domain"])
+
+    # ---------- BUILD / UPDATE ----------
+    def rebuild(self):
+        started = time.perf_counter()
+        store, size = self.store, self.store.size
+        self._clear()
+        self._grow(size)
+        # facet columns straight from the store's arrays; only the trigrams need a loop
+        self.keys = list(store.keys)
+        self.texts = [name or key for name, key in zip(store.names, store.keys)]
+        self.doc_of = {key: doc for doc, key in enumerate(self.keys)}
+        self.alive[:size] = True
+        self.industry_codes[:size] = store.industry_codes[:size]
+        for column, values in self.values.items():
+            values[:size] = store.column(column)
+        for column, codes in self.band_codes.items():
+            codes[:size] = self.bands(self.values[column][:size])
+        for doc, text in enumerate(self.texts):
+            grams = trigrams(text)
+            for gram in grams:
+                self.postings[gram].append(doc)
+            self.gram_counts[doc] = len(grams)
+        self.docs = size
+        logger.info(f"Indexed {self.docs} supplier names for search in {time.perf_counter() - started:.3f}s")
+
+    def upsert(self, row: Dict[str, Any]):
+        key, text = row["email_domain"], row.get("company_name") or row["email_domain"]
+        doc = self.doc_of.get(key)
+        if doc is None or self.texts[doc] != text:
+            if doc is not None:
+                self._kill(doc)
+            doc = self._add(key, text)
+        # facet values can change in place
+        self.industry_codes[doc] = self.store.industry_code(row["industry"])
+        for column, values in self.values.items():
+            values[doc] = np.nan if row.get(column) is None else row[column]
+        for column, codes in self.band_codes.items():
+            codes[doc] = self.bands(self.values[column][doc:doc + 1])[0]
+        self._compact_if_needed()
+
+    def _add(self, key: str, text: str) -> int:
+        doc = self.docs
+        self._grow(doc + 1)
+        grams = trigrams(text)
+        for gram in grams:
+            self.postings[gram].append(doc)
+            self._arrays.pop(gram, None)
+        self.keys.append(key)
+        self.texts.append(text)
+        self.doc_of[key] = doc
+        self.alive[doc] = True
+        self.gram_counts[doc] = len(grams)
+        self.docs += 1
+        return doc
+
+    def remove(self, key: str):
+        doc = self.doc_of.pop(key, None)
+        if doc is not None:
+            self._kill(doc)
+            self._compact_if_needed()
+
+    def _kill(self, doc: int):
+        self.alive[doc] = False
+        self.dead += 1
+
+    def _compact_if_needed(self):
+        # the store has already applied the change, so a rebuild includes it
+        if self.dead > 1000 and self.dead > COMPACT_RATIO * self.docs:
+            self.rebuild()
+
+    def _grow(self, needed: int):
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+
+        def grown(array):
+            bigger = np.zeros(new_capacity, dtype=array.dtype)
+            bigger[:capacity] = array
+            return bigger
+
+        self.alive = grown(self.alive)
+        self.gram_counts = grown(self.gram_counts)
+        self.industry_codes = grown(self.industry_codes)
+        self.values = {column: grown(values) for column, values in self.values.items()}
+        self.band_codes = {column: grown(codes) for column, codes in self.band_codes.items()}
+
+    @staticmethod
+    def bands(values: np.ndarray) -> np.ndarray:
+        """Band index per value (see BAND_LABELS); NaN goes to "unscored"."""
+        with np.errstate(invalid="ignore"):
+            bands = np.clip(values // BAND_WIDTH, 0, BAND_COUNT - 1)
+        return np.where(np.isnan(values), BAND_COUNT, bands).astype(np.int8)
+
+    def _posting(self, gram: str) -> np.ndarray:
+        array = self._arrays.get(gram)
+        if array is None:
+            array = self._arrays[gram] = np.array(self.postings.get(gram, ()), dtype=np.int32)
+        return array
+
+    # ---------- QUERY ----------
+    def match(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(matching document ids, score) for a typeahead query; an empty query matches everything.
+
+        Score is the share of query trigrams found in the name, with a small bonus for names
+        that contain little else (Jaccard similarity), so "acme" ranks "Acme" above "Acme Logistics".
+        """
+        docs = np.arange(self.docs)
+        grams = trigrams(query, prefix=True)
+        if not grams:
+            docs = docs[self.alive[:self.docs]]
+            return docs, np.zeros(len(docs))
+        shared = np.bincount(np.concatenate([self._posting(gram) for gram in grams]), minlength=self.docs)
+        coverage = shared / len(grams)
+        docs = np.flatnonzero((coverage >= MIN_COVERAGE) & self.alive[:self.docs])
+        jaccard = shared[docs] / (len(grams) + self.gram_counts[docs] - shared[docs])
+        return docs, coverage[docs] + 0.1 * jaccard
+
+    def search(self, query: str, industries: Sequence[str] = (),
+               ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Ranked page of matches plus facet counts.
+
+        Facet counts ignore the facet's own filter (industry counts don't apply the industry
+        filter, a column's band counts don't apply that column's range), so every count says
+        how many results selecting that value would give.
+        """
+        docs, scores = self.match(query)
+        industry_mask = np.ones(len(docs), dtype=bool)
+        if industries:
+            codes = [self.store.industry_code(industry) for industry in industries]
+            industry_mask = np.isin(self.industry_codes[docs], [code for code in codes if code is not None])
+
+        range_masks = {}
+        for column, (low, high) in (ranges or {}).items():
+            values = self.values[column][docs]
+            mask = np.ones(len(docs), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            range_masks[column] = mask
+
+        def combined(skip: Optional[str] = None) -> np.ndarray:
+            mask = industry_mask.copy() if skip != "industry" else np.ones(len(docs), dtype=bool)
+            for column, column_mask in range_masks.items():
+                if column != skip:
+                    mask &= column_mask
+            return mask
+
+        selected = combined()
+        if query.strip():
+            order, _, total = SupplierStore.top_by(scores, limit, offset, selected)
+        else:
+            # plain browsing: best ESG score first
+            order, _, total = SupplierStore.top_by(self.values[CRITERIA["sustainability"]][docs], limit, offset, selected)
+
+        labels = self.store.industry_labels
+        industry_counts = np.bincount(self.industry_codes[docs[combined("industry")]], minlength=len(labels))
+        facets = {
+            "industry": {labels[code]: int(count) for code, count in enumerate(industry_counts) if count},
+            "bands": {
+                column: dict(zip(BAND_LABELS, np.bincount(
+                    self.band_codes[column][docs[combined(column)]], minlength=len(BAND_LABELS)
+                ).tolist()))
+                for column in BAND_COLUMNS
+            },
+        }
+        return {
+            "total": total,
+            "matches": [(self.keys[docs[i]], float(scores[i])) for i in order.tolist()],
+            "facets": facets,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": self.docs - self.dead, "dead": self.dead, "trigrams": len(self.postings)}
+
+
+supplier_search = SupplierSearchIndex(supplier_store)
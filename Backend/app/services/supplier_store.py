@@ -0,0 +1,394 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+# Full reload: catches deletions and writes that don't bump last_updated when change streams are unavailable
+SUPPLIER_STORE_REFRESH_SECONDS = int(os.getenv("SUPPLIER_STORE_REFRESH_SECONDS", "300"))
+# Polling interval on last_updated when change streams are unavailable (standalone mongod)
+SUPPLIER_STORE_POLL_SECONDS = float(os.getenv("SUPPLIER_STORE_POLL_SECONDS", "5"))
+# Suppliers without a cost/risk/reliability (or ESG) score rank as neither good nor bad
+NEUTRAL_SCORE = float(os.getenv("SUPPLIER_NEUTRAL_SCORE", "50"))
+
+# Store column → supplier document field
+COLUMNS = {
+    "E_score": "esg_E_score",
+    "S_score": "esg_S_score",
+    "G_score": "esg_G_score",
+    "ESG_score": "esg_final_score",
+    "cost": "cost_score",
+    "risk": "risk_score",
+    "reliability": "reliability_score",
+    "production_cost": "production_cost_per_unit",
+    "logistics_cost": "logistics_cost_per_unit",
+    "capacity": "capacity",
+}
+# Trade-off criterion → store column
+CRITERIA = {
+    "cost": "cost",
+    "sustainability": "ESG_score",
+    "risk": "risk",
+    "reliability": "reliability",
+}
+PROJECTION = {"email_domain": 1, "company_name": 1, "industry": 1, "last_updated": 1, **{field: 1 for field in COLUMNS.values()}}
+
+Listener = Callable[[str, Optional[Dict[str, Any]]], None]
+
+
+def _score(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+class SupplierStore:
+    """Process-local columnar copy of every supplier's identity, scores and cost figures.
+
+    One NumPy column per number (NaN where unknown) plus an integer industry code column;
+    ranking, filtering and aggregation read only these arrays, never Mongo or the large
+    ESG blobs. Rows are dense: a deleted row is replaced by the last one.
+
+    Kept fresh from a Mongo change stream, or, where change streams are not supported,
+    by polling `last_updated` plus a periodic full reload. Listeners are told about every
+    upsert ("upsert", row dict), deletion ("delete", row dict) and full reload ("reload", None).
+    """
+
+    def __init__(self, collection, refresh_seconds: int = SUPPLIER_STORE_REFRESH_SECONDS,
+                 poll_seconds: float = SUPPLIER_STORE_POLL_SECONDS):
+        self.collection = collection
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self.listeners: List[Listener] = []
+        self.mode: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self.last_event_at: Optional[datetime] = None
+        self._watermark: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self._clear()
+
+    def _clear(self):
+        self.size = 0
+        self.ids: List[str] = []
+        self.keys: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.columns: Dict[str, np.ndarray] = {column: np.empty(0) for column in COLUMNS}
+        self.industry_codes = np.empty(0, dtype=np.int32)
+        self.industry_labels: List[str] = []
+        self.industry_lookup: Dict[str, int] = {}
+        self.position: Dict[str, int] = {}
+        self.id_position: Dict[str, int] = {}
+
+    def add_listener(self, listener: Listener):
+        self.listeners.append(listener)
+
+    def _notify(self, event: str, row: Optional[Dict[str, Any]]):
+        for listener in self.listeners:
+            try:
+                listener(event, row)
+            except Exception as e:
+                logger.error(f"Supplier store listener failed on {event}: {e}")
+
+    # ---------- LOAD / UPDATE ----------
+    async def reload(self):
+        started = time.perf_counter()
+        suppliers = await self.collection.find({"email_domain": {"$exists": True}}, PROJECTION).to_list(length=None)
+
+        # rebuild and swap in without awaiting, so readers never see a half-built store
+        self._clear()
+        self._grow(len(suppliers))
+        for supplier in suppliers:
+            self._upsert(supplier)
+        self.loaded_at = datetime.utcnow()
+        self._watermark = max((s["last_updated"] for s in suppliers if isinstance(s.get("last_updated"), datetime)),
+                              default=self._watermark)
+        logger.info(f"Loaded {self.size} suppliers into the score store in {time.perf_counter() - started:.3f}s")
+        self._notify("reload", None)
+
+    def upsert(self, supplier: Dict[str, Any]):
+        i = self._upsert(supplier)
+        self._notify("upsert", self.row(i))
+
+    def _upsert(self, supplier: Dict[str, Any]) -> int:
+        key = supplier["email_domain"]
+        supplier_id = str(supplier["_id"]) if supplier.get("_id") is not None else None
+        i = self.position.get(key)
+        if i is None and supplier_id is not None:
+            i = self.id_position.get(supplier_id)
+        if i is None:
+            i = self.size
+            self._grow(i + 1)
+            self.ids.append(supplier_id)
+            self.keys.append(key)
+            self.names.append(None)
+            self.size += 1
+        elif self.keys[i] != key:  # email_domain changed
+            self.position.pop(self.keys[i], None)
+            self.keys[i] = key
+        if supplier_id is not None:
+            self.ids[i] = supplier_id
+            self.id_position[supplier_id] = i
+        self.position[key] = i
+
+        self.names[i] = supplier.get("company_name")
+        self.industry_codes[i] = self._industry_code(supplier.get("industry"))
+        for column, field in COLUMNS.items():
+            self.columns[column][i] = _score(supplier.get(field))
+        updated = supplier.get("last_updated")
+        if isinstance(updated, datetime) and (self._watermark is None or updated > self._watermark):
+            self._watermark = updated
+        return i
+
+    def remove(self, supplier_id: str):
+        i = self.id_position.pop(supplier_id, None)
+        if i is None:
+            return
+        removed = self.row(i)
+        last = self.size - 1
+        self.position.pop(self.keys[i], None)
+        if i != last:
+            # move the last row into the hole
+            self.ids[i], self.keys[i], self.names[i] = self.ids[last], self.keys[last], self.names[last]
+            self.industry_codes[i] = self.industry_codes[last]
+            for column in self.columns.values():
+                column[i] = column[last]
+            self.position[self.keys[i]] = i
+            if self.ids[i] is not None:
+                self.id_position[self.ids[i]] = i
+        self.ids.pop()
+        self.keys.pop()
+        self.names.pop()
+        self.size -= 1
+        self._notify("delete", removed)
+
+    def _industry_code(self, industry: Optional[str]) -> int:
+        label = (industry or "").strip()
+        normalized = label.lower() or "unknown"
+        code = self.industry_lookup.get(normalized)
+        if code is None:
+            code = len(self.industry_labels)
+            self.industry_lookup[normalized] = code
+            self.industry_labels.append(label or "unknown")
+        return code
+
+    def _grow(self, needed: int):
+        capacity = len(self.industry_codes)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        for column_name, column in self.columns.items():
+            grown = np.full(new_capacity, np.nan)
+            grown[:capacity] = column
+            self.columns[column_name] = grown
+        codes = np.zeros(new_capacity, dtype=np.int32)
+        codes[:capacity] = self.industry_codes
+        self.industry_codes = codes
+
+    async def refresh(self, email_domain: str):
+        """Re-read one supplier after it was written, so reads reflect it before the change event arrives."""
+        supplier = await self.collection.find_one({"email_domain": email_domain}, PROJECTION)
+        if supplier:
+            self.upsert(supplier)
+
+    # ---------- SYNC WITH MONGO ----------
+    async def start(self):
+        await self.reload()
+        self._tasks = [asyncio.create_task(self._follow())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _follow(self):
+        try:
+            await self._watch()
+        except OperationFailure as e:
+            # standalone servers have no oplog to stream from
+            logger.warning(f"Supplier change stream unavailable ({e}); polling last_updated instead")
+        self.mode = "polling"
+        self._tasks.append(asyncio.create_task(self._reloader()))
+        await self._poll()
+
+    async def _watch(self):
+        resume_token = None
+        while True:
+            try:
+                async with self.collection.watch(full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.mode = "change_stream"
+                    logger.info("Following supplier changes through a change stream")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._apply(change)
+            except OperationFailure:
+                if self.mode is None:
+                    raise
+                logger.exception("Supplier change stream failed, reloading and resuming")
+                resume_token = None
+                await asyncio.sleep(1)
+                await self.reload()
+            except PyMongoError as e:
+                logger.error(f"Supplier change stream interrupted: {e}")
+                await asyncio.sleep(1)
+
+    def _apply(self, change: Dict[str, Any]):
+        self.last_event_at = datetime.utcnow()
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            supplier = change.get("fullDocument")
+            if supplier and supplier.get("email_domain"):
+                self.upsert(supplier)
+            elif not supplier:  # deleted again before the lookup
+                self.remove(str(change["documentKey"]["_id"]))
+        elif operation == "delete":
+            self.remove(str(change["documentKey"]["_id"]))
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            if self._watermark is None:
+                continue
+            try:
+                cursor = self.collection.find({"last_updated": {"$gt": self._watermark}}, PROJECTION)
+                async for supplier in cursor:
+                    if supplier.get("email_domain"):
+                        self.last_event_at = datetime.utcnow()
+                        self.upsert(supplier)
+            except Exception as e:
+                logger.error(f"Supplier store poll failed: {e}")
+
+    async def _reloader(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Supplier store reload failed: {e}")
+
+    # ---------- QUERIES ----------
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][:self.size]
+
+    def criteria_matrix(self, criteria=tuple(CRITERIA)) -> np.ndarray:
+        """(suppliers × criteria) where higher is better everywhere: risk is inverted, unknown is neutral."""
+        matrix = np.empty((self.size, len(criteria)))
+        for j, name in enumerate(criteria):
+            values = self.column(CRITERIA[name])
+            values = np.where(np.isnan(values), NEUTRAL_SCORE, values)
+            matrix[:, j] = 100 - values if name == "risk" else values
+        return matrix
+
+    def weighted_scores(self, weights: Dict[str, float]) -> np.ndarray:
+        """Same overall score as the trade-off simulator: weights are percentages, risk counts inverted."""
+        criteria = tuple(CRITERIA)
+        return self.criteria_matrix(criteria) @ np.array([weights[name] for name in criteria], dtype=float) / 100
+
+    def industry_code(self, industry: str) -> Optional[int]:
+        return self.industry_lookup.get(industry.strip().lower() or "unknown")
+
+    def mask(self, industry: Optional[str] = None,
+             ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> Optional[np.ndarray]:
+        """Rows matching an industry and inclusive per-column (min, max) ranges; None means all rows.
+
+        Rows with an unknown (NaN) value never match a range on that column.
+        """
+        mask = None
+        if industry:
+            code = self.industry_code(industry)
+            mask = self.industry_codes[:self.size] == (code if code is not None else -1)
+        for column, (low, high) in (ranges or {}).items():
+            values = self.column(column)
+            if low is not None:
+                mask = (values >= low) if mask is None else mask & (values >= low)
+            if high is not None:
+                mask = (values <= high) if mask is None else mask & (values <= high)
+        return mask
+
+    def top(self, weights: Dict[str, float], limit: int, offset: int = 0, mask: Optional[np.ndarray] = None):
+        return self.top_by(self.weighted_scores(weights), limit, offset, mask)
+
+    @staticmethod
+    def top_by(scores: np.ndarray, limit: int, offset: int = 0, mask: Optional[np.ndarray] = None):
+        """Rows ranked offset..offset+limit by descending score, as (row indices, scores, matching total).
+
+        Only the first offset+limit rows are ever sorted: argpartition selects them in O(n).
+        NaN scores rank last.
+        """
+        candidates = np.flatnonzero(mask) if mask is not None else None
+        if candidates is not None:
+            scores = scores[candidates]
+        total = len(scores)
+
+        needed = min(offset + limit, total)
+        if needed <= 0 or offset >= total:
+            return np.empty(0, dtype=int), np.empty(0), total
+        keys = np.where(np.isnan(scores), -np.inf, scores)
+        if needed < total:
+            selected = np.argpartition(-keys, needed - 1)[:needed]
+        else:
+            selected = np.arange(total)
+        # highest score first, ties broken by row for a stable order across pages
+        selected = selected[np.lexsort((selected, -keys[selected]))][offset:needed]
+
+        rows = candidates[selected] if candidates is not None else selected
+        return rows, scores[selected], total
+
+    def aggregate(self, mask: Optional[np.ndarray] = None, group_by_industry: bool = True) -> Dict[str, Any]:
+        """count / mean / min / max / median of every column, per industry or overall; NaN values are skipped."""
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(self.size)
+        if group_by_industry:
+            codes = self.industry_codes[rows]
+            groups = {self.industry_labels[code]: rows[codes == code] for code in np.unique(codes)}
+        else:
+            groups = {"all": rows}
+
+        result = {}
+        for label, group in groups.items():
+            stats = {"suppliers": int(len(group))}
+            for column in COLUMNS:
+                values = self.column(column)[group]
+                values = values[~np.isnan(values)]
+                stats[column] = {
+                    "count": int(len(values)),
+                    "mean": round(float(values.mean()), 2) if len(values) else None,
+                    "min": round(float(values.min()), 2) if len(values) else None,
+                    "max": round(float(values.max()), 2) if len(values) else None,
+                    "median": round(float(np.median(values)), 2) if len(values) else None,
+                }
+            result[label] = stats
+        return result
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": self.ids[i],
+            "email_domain": self.keys[i],
+            "company_name": self.names[i],
+            "industry": self.industry_labels[self.industry_codes[i]],
+            **{column: (None if np.isnan(values[i]) else float(values[i])) for column, values in self.columns.items()},
+        }
+
+    def get(self, email_domain: str) -> Optional[Dict[str, Any]]:
+        i = self.position.get(email_domain)
+        return self.row(i) if i is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "suppliers": self.size,
+            "industries": len(self.industry_labels),
+            "mode": self.mode,
+            "loaded_at": self.loaded_at,
+            "last_event_at": self.last_event_at,
+            "watermark": self._watermark,
+        }
+
+
+supplier_store = SupplierStore(db.suppliers)
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.database import db
+from app.services.supplier_store import SupplierStore, supplier_store
+
+logger = logging.getLogger(__name__)
+
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", "10000"))
+# Upper bound on how stale a cached document can be when another instance wrote it
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", "60"))
+
+# Tenant collection of each user role
+ROLE_TENANTS = {"supplier": "suppliers"}
+DEFAULT_TENANT = "companies"
+
+# Fields never cached: login reads the password hash from the database itself
+PROJECTIONS = {"users": {"password": 0}}
+
+Key = Tuple[str, str]
+
+
+def tenant_collection(role: Optional[str]) -> str:
+    return ROLE_TENANTS.get((role or "").lower(), DEFAULT_TENANT)
+
+
+def email_domain(email: str) -> str:
+    return email.split("@")[-1]
+
+
+class TenantRepository:
+    """Users by email and tenants (suppliers, companies) by email domain, behind a TTL cache.
+
+    Only documents that exist are cached, so registering a new user or tenant never has to
+    wait out a cached miss. Concurrent misses for the same key share one query. Writers call
+    `invalidate` after writing; supplier changes made elsewhere (other instances, bulk
+    rescoring) arrive through the supplier store's listener, the TTL bounds the rest.
+
+    Lookups and stores never await, so they are atomic on the event loop and need no lock.
+    Callers get a shallow copy and must not modify nested values.
+    """
+
+    def __init__(self, database, maxsize: int = TENANT_CACHE_SIZE, ttl: int = TENANT_CACHE_TTL):
+        self.database = database
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending: Dict[Key, asyncio.Future] = {}
+        # bumped by every invalidation; a query that started before one doesn't fill the cache
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, store: SupplierStore = supplier_store):
+        store.add_listener(self.on_supplier_change)
+
+    def on_supplier_change(self, event: str, row: Optional[Dict[str, Any]]):
+        if event == "reload":
+            self.invalidate("suppliers")
+        elif row and row.get("email_domain"):
+            self.invalidate("suppliers", row["email_domain"])
+
+    # ---------- READ ----------
+    async def user(self, email: str) -> Optional[Dict[str, Any]]:
+        """The user document without its password hash."""
+        return await self._get("users", "email", email)
+
+    async def tenant(self, collection: str, domain: str) -> Optional[Dict[str, Any]]:
+        return await self._get(collection, "email_domain", domain)
+
+    async def supplier(self, domain: str) -> Optional[Dict[str, Any]]:
+        return await self.tenant("suppliers", domain)
+
+    async def company(self, domain: str) -> Optional[Dict[str, Any]]:
+        return await self.tenant("companies", domain)
+
+    async def tenant_of(self, role: Optional[str], email: str) -> Optional[Dict[str, Any]]:
+        """The supplier or company a user with `role` and `email` belongs to."""
+        return await self.tenant(tenant_collection(role), email_domain(email))
+
+    async def _get(self, collection: str, field: str, value: str) -> Optional[Dict[str, Any]]:
+        key = (collection, value)
+        document = self._cache.get(key)
+        if document is not None:
+            self.hits += 1
+            return dict(document)
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._load(key, field))
+        else:
+            self.hits += 1  # shares the query already in flight
+        # shielded, so a cancelled request doesn't cancel the query other requests wait for
+        document = await asyncio.shield(pending)
+        return dict(document) if document is not None else None
+
+    async def _load(self, key: Key, field: str) -> Optional[Dict[str, Any]]:
+        collection, value = key
+        generation = self._generation
+        try:
+            document = await self.database[collection].find_one({field: value}, PROJECTIONS.get(collection))
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+        if document is not None and generation == self._generation:
+            self._cache[key] = document
+        return document
+
+    # ---------- INVALIDATE ----------
+    def invalidate(self, collection: str, value: Optional[str] = None):
+        """Forget one cached document (`value` = email or domain), or every one of `collection`."""
+        self._generation += 1
+        if value is not None:
+            self._cache.pop((collection, value), None)
+            self._pending.pop((collection, value), None)
+            return
+        for key in [key for key in list(self._cache.keys()) if key[0] == collection]:
+            self._cache.pop(key, None)
+        for key in [key for key in self._pending if key[0] == collection]:
+            self._pending.pop(key, None)
+
+    def invalidate_user(self, email: str):
+        self.invalidate("users", email)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+        }
+
+
+tenants = TenantRepository(db)
@@ -30,8 +30,9 @@ def convert_to_standard_unit(value: Optional[str]) -> Optional[Union[int, float]
         'mn': 1_000_000, 'bn': 1_000_000_000
     }
     
-    # More flexible pattern to catch various formats
-    pattern = r'([\d\.\-]+)\s*(million|billion|thousand|k|m|b|mn|bn)?'
+    # More flexible pattern to catch various formats; the multiplier must be a whole word so
+    # units such as '120 MWh' or '3 m3' are not read as millions
+    pattern = r'([\d\.\-]+)\s*(million|billion|thousand|k|m|b|mn|bn)?\b'
     match = re.match(pattern, cleaned_value)
 
     if match:
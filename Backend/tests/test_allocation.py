@@ -0,0 +1,183 @@
+from dataclasses import replace
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from app.services.allocation import ALLOCATION_MIP_GAP, AllocationError, AllocationProblem, solve
+
+SEEDS = range(10)
+
+
+def random_problem(seed, n=8, **limits):
+    rng = np.random.default_rng(seed)
+    capacity = rng.uniform(50, 300, n)
+    return AllocationProblem(
+        demand=float(capacity.sum() * rng.uniform(0.3, 0.7)),
+        unit_cost=rng.uniform(5, 20, n),
+        capacity=capacity,
+        esg=rng.uniform(20, 95, n),
+        risk=rng.uniform(5, 80, n),
+        **limits,
+    )
+
+
+def greedy_fill(unit_cost, upper, demand):
+    """Cheapest suppliers first up to their bound: optimal without portfolio limits."""
+    quantities = np.zeros(len(unit_cost))
+    remaining = demand
+    for i in np.argsort(unit_cost):
+        quantities[i] = min(upper[i], remaining)
+        remaining -= quantities[i]
+    assert remaining <= 1e-9
+    return quantities
+
+
+def constraint(result, name):
+    return next(c for c in result["constraints"] if c["name"] == name)
+
+
+def cost_change(problem, eps, **changed):
+    """Total cost difference per unit when the fields in `changed` move by `eps`."""
+    return (solve(replace(problem, **changed))["total_cost"] - solve(problem)["total_cost"]) / eps
+
+
+# ---------- LP ----------
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lp_matches_greedy_fill(seed):
+    problem = random_problem(seed)
+    result = solve(problem)
+    expected = greedy_fill(problem.unit_cost, problem.capacity, problem.demand)
+    assert result["solver"] == "highs-lp"
+    assert result["total_cost"] == pytest.approx(problem.unit_cost @ expected)
+    np.testing.assert_allclose(result["quantities"], expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lp_max_share_matches_greedy_fill(seed):
+    problem = random_problem(seed, max_share=0.2)
+    if np.minimum(problem.capacity, 0.2 * problem.demand).sum() < problem.demand:
+        problem = replace(problem, max_share=0.3)
+    result = solve(problem)
+    expected = greedy_fill(problem.unit_cost, np.minimum(problem.capacity, problem.max_share * problem.demand), problem.demand)
+    assert result["total_cost"] == pytest.approx(problem.unit_cost @ expected)
+    assert result["quantities"].max() <= problem.max_share * problem.demand * (1 + 1e-9)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lp_shadow_prices_match_finite_differences(seed):
+    problem = random_problem(seed)
+    cheapest = greedy_fill(problem.unit_cost, problem.capacity, problem.demand)
+    # a floor halfway between the cheapest allocation's ESG and the best reachable one binds
+    greenest = greedy_fill(-problem.esg, problem.capacity, problem.demand)
+    min_esg = float(problem.esg @ (cheapest + greenest) / 2 / problem.demand)
+    problem = replace(problem, min_esg=min_esg)
+    result = solve(problem)
+    eps = 1e-4
+
+    assert "min_esg" in result["binding"]
+    # raising the floor costs money, more demand costs money, more capacity saves it
+    assert constraint(result, "min_esg")["shadow_price"] > 0
+    assert constraint(result, "min_esg")["shadow_price"] == pytest.approx(
+        cost_change(problem, eps, min_esg=min_esg + eps), rel=1e-3)
+    assert constraint(result, "demand")["shadow_price"] > 0
+    assert constraint(result, "demand")["shadow_price"] == pytest.approx(
+        cost_change(problem, eps, demand=problem.demand + eps), rel=1e-3)
+
+    capacity = constraint(result, "capacity")
+    for i, price in zip(capacity["suppliers"], capacity["shadow_price"]):
+        assert price <= 0
+        more = problem.capacity.copy()
+        more[i] += eps
+        assert price == pytest.approx(cost_change(problem, eps, capacity=more), rel=1e-3, abs=1e-6)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lp_max_risk_shadow_price(seed):
+    problem = random_problem(seed)
+    cheapest = greedy_fill(problem.unit_cost, problem.capacity, problem.demand)
+    safest = greedy_fill(problem.risk, problem.capacity, problem.demand)
+    max_risk = float(problem.risk @ (cheapest + safest) / 2 / problem.demand)
+    problem = replace(problem, max_risk=max_risk)
+    result = solve(problem)
+
+    assert "max_risk" in result["binding"]
+    assert result["quantities"] @ problem.risk / problem.demand <= max_risk + 1e-6
+    # loosening the risk ceiling saves money
+    price = constraint(result, "max_risk")["shadow_price"]
+    assert price < 0
+    assert price == pytest.approx(cost_change(problem, 1e-4, max_risk=max_risk + 1e-4), rel=1e-3)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lp_max_share_shadow_price(seed):
+    problem = random_problem(seed)
+    # a cap below the largest quantity of the cheapest allocation binds
+    cheapest = greedy_fill(problem.unit_cost, problem.capacity, problem.demand)
+    problem = replace(problem, max_share=0.8 * cheapest.max() / problem.demand)
+    result = solve(problem)
+    share = constraint(result, "max_share")
+    assert share["binding"]
+    # per percentage point, the unit of the request
+    eps = 1e-4
+    assert share["shadow_price"] <= 0
+    assert share["shadow_price"] == pytest.approx(
+        cost_change(problem, eps * 100, max_share=problem.max_share + eps), rel=1e-3, abs=1e-6)
+
+
+def test_lp_infeasible_floor_is_diagnosed():
+    problem = random_problem(0, min_esg=99)
+    with pytest.raises(AllocationError) as error:
+        solve(problem)
+    assert any(reason.startswith("min_esg") for reason in error.value.diagnostics)
+
+
+# ---------- MILP ----------
+def enumerated_cost(problem):
+    """Cheapest allocation over every subset of at most max_suppliers suppliers, each given ≥ min_order."""
+    n = problem.size
+    min_order = problem.min_order or 0.0
+    upper = problem.capacity.astype(float)
+    best = None
+    for size in range(1, (problem.max_suppliers or n) + 1):
+        for subset in map(list, combinations(range(n), size)):
+            if (upper[subset] < min_order).any() or size * min_order > problem.demand or upper[subset].sum() < problem.demand:
+                continue
+            # everyone gets min_order, the rest goes cheapest first
+            extra = greedy_fill(problem.unit_cost[subset], upper[subset] - min_order, problem.demand - size * min_order)
+            cost = float(problem.unit_cost[subset] @ (extra + min_order))
+            best = cost if best is None else min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("max_suppliers, min_order", [(2, None), (3, None), (None, 120.0), (3, 100.0)])
+def test_milp_matches_subset_enumeration(seed, max_suppliers, min_order):
+    problem = random_problem(seed, n=6, max_suppliers=max_suppliers, min_order=min_order)
+    expected = enumerated_cost(problem)
+    if expected is None:
+        with pytest.raises(AllocationError):
+            solve(problem)
+        return
+    result = solve(problem)
+    quantities = result["quantities"]
+    used = quantities > 0
+    assert result["solver"] == "highs-milp"
+    # HiGHS may stop within ALLOCATION_MIP_GAP of the optimum
+    assert expected <= result["total_cost"] * (1 + 1e-9) + 1e-6
+    assert result["total_cost"] <= expected * (1 + ALLOCATION_MIP_GAP) + 1e-6
+    assert quantities.sum() == pytest.approx(problem.demand)
+    assert (quantities <= problem.capacity + 1e-6).all()
+    if max_suppliers is not None:
+        assert used.sum() <= max_suppliers
+    if min_order is not None:
+        assert (quantities[used] >= min_order - 1e-6).all()
+
+
+def test_milp_keeps_portfolio_limits():
+    problem = random_problem(3, n=6, max_suppliers=3, min_esg=55.0, max_risk=45.0)
+    result = solve(problem)
+    quantities = result["quantities"]
+    assert problem.esg @ quantities / problem.demand >= 55.0 - 1e-6
+    assert problem.risk @ quantities / problem.demand <= 45.0 + 1e-6
+    assert (quantities > 0).sum() <= 3
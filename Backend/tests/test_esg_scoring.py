@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from app.services.esg_scoring import (
+    SUBFACTORS,
+    WEIGHT_PROFILES,
+    _load_fixture,
+    _load_weight_profiles,
+    compute_subfactor_scores,
+    final_score,
+    resolve_inputs,
+    score_inputs,
+    validate_weights,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "app", "extracted_reports")
+
+
+def load(name):
+    return _load_fixture(os.path.join(FIXTURES, name))
+
+
+def scores_of(name):
+    return compute_subfactor_scores(*load(name))
+
+
+def test_every_subfactor_is_scored():
+    scores = scores_of("ESG_Report_extracted.json")
+    assert {category: set(values) for category, values in scores.items()} == {
+        category: {subfactor.name for subfactor in subfactors} for category, subfactors in SUBFACTORS.items()
+    }
+
+
+def test_dummy_report_scores_nothing():
+    # every extracted value is null: no score may be invented
+    result, overall_data = load("Dummy_ESG_Report_extracted.json")
+    assert all(value is None for value in resolve_inputs(result, overall_data).values())
+    scores = compute_subfactor_scores(result, overall_data)
+    assert all(value is None for values in scores.values() for value in values.values())
+
+
+@pytest.mark.parametrize("result, overall_data", [({}, {}), (None, None), ("not a dict", []), ({"total_employees": ""}, {})])
+def test_empty_or_malformed_input_scores_nothing(result, overall_data):
+    scores = compute_subfactor_scores(result, overall_data)
+    assert all(value is None for values in scores.values() for value in values.values())
+
+
+def test_formulas_on_esg_report_fixture():
+    scores = scores_of("ESG_Report_extracted.json")
+    expected = {
+        "Environmental": {
+            "GHG Score": 100 * (1 - 0.45 / 2.85),
+            "Energy Efficiency Score": 100 * (1 - 120 / 3150),
+            "Water Efficiency Score": 0,  # 100 * (1 - 80 / 3.85) is far below 0
+            "Waste Recycling Score": 100 * 750 / 1000,
+            "Compliance Score": 100 - 10 * 7.5,
+            "Renewable Energy Score": 100 * 4000 / 10000,
+            "Biodiversity Score": 100 - 30 / 40 * 100,
+            "Climate Risk Management Score": 100 * 5 / 18,
+        },
+        "Social": {
+            "Retention Score": 100 * (1 - 0.12 / 15),
+            "Safety Score": 100 * (1 - 1.2 / 3.85),
+            "Diversity Score": 100 * 180 / 500,
+            "Community Investment Score": 100 * 250000 / 50000000,
+            "Customer Satisfaction Score": 65,
+            "Human Rights Score": 0,  # 100 - 10 * 15 is below 0
+            "Training Score": 100 * 25 / 40,
+        },
+        "Governance": {
+            "Board Independence Score": 100 * 6 / 10,
+            "Compensation Alignment Score": 100 - abs((150 - 200) / 200 * 100),
+            "Audit Committee Score": 100 * 3 / 4,
+            "Shareholder Rights Score": 100 * 7 / 14,
+            "Transparency Score": 100 * 18 / 50,
+            "Anti-Corruption Score": 100,
+            "Tax Transparency Score": 100 * 8 / 10,
+        },
+    }
+    assert scores == {
+        category: {name: round(value, 2) for name, value in values.items()} for category, values in expected.items()
+    }
+
+
+def test_hyundai_fixture_uses_overall_data_fallbacks():
+    result, overall_data = load("Hyundai-2024-sustainability-report-en-v2_removed_removed_extracted.json")
+    assert result["company_ghg_emissions_per_unit_revenue"] is None
+    inputs = resolve_inputs(result, overall_data)
+    # intensity from the absolute total and the production volume in overall_data
+    assert inputs["company_ghg_emissions_per_unit_revenue"] == pytest.approx(2275751 / 4289776)
+
+    scores = compute_subfactor_scores(result, overall_data)
+    assert scores["Environmental"]["GHG Score"] == round(100 * (1 - 2275751 / 4289776 / 2.85), 2)
+    assert scores["Environmental"]["Waste Recycling Score"] == round(100 * 957463 / 1024155, 2)
+    assert scores["Social"]["Training Score"] == 100  # 47.5 h against a 40 h benchmark is capped
+    assert scores["Governance"]["Board Independence Score"] == round(100 * 7 / 12, 2)
+    # nothing in the report or overall_data for these
+    assert scores["Environmental"]["Biodiversity Score"] is None
+    assert scores["Governance"]["Tax Transparency Score"] is None
+
+
+@pytest.mark.parametrize("field, value, category, name, expected", [
+    ("company_ghg_emissions_per_unit_revenue", 10.0, "Environmental", "GHG Score", 0),
+    ("company_ghg_emissions_per_unit_revenue", -1.0, "Environmental", "GHG Score", 100),
+    ("avg_training_hours_per_employee", 400, "Social", "Training Score", 100),
+    ("net_promoter_score", -150, "Social", "Customer Satisfaction Score", -100),  # NPS keeps its -100..100 range
+    ("net_promoter_score", -40, "Social", "Customer Satisfaction Score", -40),
+    ("ceo_pay_ratio", 900, "Governance", "Compensation Alignment Score", 0),
+])
+def test_scores_are_clamped_to_bounds(field, value, category, name, expected):
+    assert score_inputs({field: value})[category][name] == expected
+
+
+def test_zero_denominator_gives_no_score():
+    scores = score_inputs({"amount_waste_recycled": 10, "total_waste_generated": 0})
+    assert scores["Environmental"]["Waste Recycling Score"] is None
+
+
+def test_missing_second_input_gives_no_score():
+    scores = score_inputs({"number_independent_directors": 7})
+    assert scores["Governance"]["Board Independence Score"] is None
+
+
+def test_final_score_weights_categories():
+    categories = {"Environmental": 80.0, "Social": 60.0, "Governance": 40.0}
+    assert final_score(categories, WEIGHT_PROFILES["default"]) == round(0.4 * 80 + 0.35 * 60 + 0.25 * 40, 2)
+    for weights in WEIGHT_PROFILES.values():
+        assert sum(weights.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("weights", [
+    {"Environmental": 10, "Social": 10, "Governance": 10},
+    {"Environmental": 1.2, "Social": -0.1, "Governance": -0.1},
+    {"Environmental": 0.5, "Social": 0.5},
+    {"Environmental": "0.4", "Social": 0.35, "Governance": 0.25},
+    {"Environmental": float("nan"), "Social": 0.5, "Governance": 0.5},
+])
+def test_invalid_weights_are_rejected(weights):
+    with pytest.raises(ValueError):
+        validate_weights(weights)
+
+
+def test_weight_profiles_from_env_are_validated():
+    assert _load_weight_profiles('{"Mining": {"Environmental": 0.5, "Social": 0.3, "Governance": 0.2}}') == {
+        "mining": {"Environmental": 0.5, "Social": 0.3, "Governance": 0.2},
+    }
+    with pytest.raises(ValueError, match="mining"):
+        _load_weight_profiles('{"mining": {"Environmental": 1, "Social": 1, "Governance": 1}}')